@@ -0,0 +1,45 @@
+"""Micro-benchmark of utils.decode_token with and without the claims cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_decode_token.py
+"""
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+import jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.ucams import utils  # noqa: E402
+
+NUMBER = 20000
+
+
+def main() -> None:
+    exp = int(time.time()) + 3600
+    tokens = [jwt.encode({"exp": exp, "number": f"cam-{i}"}, "secret") for i in range(100)]
+
+    def run():
+        for token in tokens:
+            utils.decode_token(token)
+
+    uncached = timeit.timeit(
+        lambda: [utils._decode_token_claims(token) for token in tokens], number=NUMBER // len(tokens)
+    )
+    utils._token_claims.clear()
+    cached = timeit.timeit(run, number=NUMBER // len(tokens))
+
+    print(json.dumps({
+        "calls": NUMBER,
+        "uncached_us_per_call": round(uncached / NUMBER * 1e6, 3),
+        "cached_us_per_call": round(cached / NUMBER * 1e6, 3),
+        "speedup": round(uncached / cached, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Offline load benchmark of entry setup and the camera hot paths.
+
+Builds synthetic accounts (cameras, contracts, SKUDs), serves them with
+aioresponses and prints one JSON document with the results per account size.
+Entry setup runs ``async_setup_entry`` and the setup of every platform; only
+Home Assistant's entity platform machinery is left out (entities are collected,
+not registered). Each account is set up twice: from the cloud and then from the
+state persisted by the first run.
+
+Run from the repository root:
+
+    python benchmarks/bench_load.py --cameras 10 100 1000 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib import import_module
+from pathlib import Path
+from types import SimpleNamespace
+
+import jwt
+from aioresponses import CallbackResult, aioresponses
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.ucams import PLATFORMS, async_setup_entry  # noqa: E402
+from custom_components.ucams.utils import SCREEN  # noqa: E402
+
+DOM_URL = "https://dom.example.com/"
+CAMS_URL = "https://cams.example.com/"
+SCREENSHOT_DOMAIN = "screen.example.com"
+HOT_PATH_CALLS = 1000
+
+
+def _token(**claims) -> str:
+    return jwt.encode({"exp": int(time.time()) + 86400, **claims}, "secret")
+
+
+class SyntheticAccount:
+    """Cameras, contracts and SKUDs of one fake customer; skud and contract counts follow the camera count."""
+
+    def __init__(self, cameras: int):
+        self.cameras = [
+            {
+                "number": f"{1700000000 + i}",
+                "title": f"Камера {i} подъезд {i % 12}",
+                "server": {"domain": f"flussonic{i % 8}.example.com", "screenshot_domain": SCREENSHOT_DOMAIN},
+                "token_l": _token(number=i),
+            }
+            for i in range(cameras)
+        ]
+        self.contracts = [
+            {"contract_id": 10000 + i, "billing_id": 1, "title": f"Договор {i}"}
+            for i in range(max(cameras // 10, 1))
+        ]
+        self.skuds = [
+            {
+                "id": i,
+                "string_view": f"Домофон {i}",
+                "timeout": 5,
+                "cctv_number": self.cameras[i * 2]["number"] if i * 2 < cameras else None,
+            }
+            for i in range(max(cameras // 5, 1))
+        ]
+
+    def contract_detail(self, contract: dict) -> dict:
+        return {
+            "contract_id": contract["contract_id"],
+            "contract_title": contract["title"],
+            "contract_address": {"city": "Уфа", "street": "Ленина", "house": "1", "flat": "1"},
+            "balance": {
+                "input_saldo": 0, "charge": 500, "payment": 500, "current": 0, "output_saldo": 0,
+                "recommended": 500, "limit": 0, "expiry_date": int(time.time()),
+            },
+            "services": [
+                {
+                    "service_id": 1, "service_title_name": "Видеонаблюдение", "service_status": "active",
+                    "period_end": int(time.time()), "cost": 100, "tariff": {"title": "Базовый"}, "date_from": "2024-01-01",
+                },
+            ],
+        }
+
+    def mock(self, m: aioresponses) -> None:
+        m.post(f"{DOM_URL}api/v1/auth/auth_by_contract/",
+               payload={"token": {"access": _token(), "refresh": _token()}}, repeat=True)
+        m.get(f"{DOM_URL}api/v0/contract/",
+              payload=[{"isp_org": {"cams_server": {"url": CAMS_URL}}}], repeat=True)
+        m.get(f"{DOM_URL}api/v0/skud/shared/", payload=self.skuds, repeat=True)
+        m.get(f"{DOM_URL}api/v0/contract_info/get_all_contract/",
+              payload={"status": "ok", "detail": {"contracts": self.contracts}}, repeat=True)
+        m.post(f"{DOM_URL}api/v0/contract_info/get_contract_info/", callback=self._contract_details, repeat=True)
+        m.post(f"{CAMS_URL}api/v0/auth/?ttl=20800", payload={"token": _token()}, repeat=True)
+        m.post(f"{CAMS_URL}api/v0/cameras/my/", callback=self._cameras_page, repeat=True)
+        m.get(re.compile(rf"https://{re.escape(SCREENSHOT_DOMAIN)}/api/v0/screenshots/.*"),
+              body=b"\xff\xd8" + b"\0" * 30000 + b"\xff\xd9", repeat=True)
+
+    def _cameras_page(self, url, json=None, **kwargs):
+        page_size = json["page_size"]
+        start = (json["page"] - 1) * page_size
+        return CallbackResult(payload={"results": self.cameras[start:start + page_size]})
+
+    def _contract_details(self, url, json=None, **kwargs):
+        ids = {contract["contract_id"] for contract in json["contracts"]}
+        details = [self.contract_detail(contract) for contract in self.contracts if contract["contract_id"] in ids]
+        return CallbackResult(payload={"detail": details})
+
+
+def _deep_sizeof(value, seen=None) -> int:
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_deep_sizeof(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(_deep_sizeof(getattr(value, slot, None), seen) for slot in value.__slots__)
+    return size
+
+
+async def _latency_us(func, args_list) -> dict:
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        result = func(*args)
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 2),
+    }
+
+
+async def run_account(hass, camera_count: int) -> dict:
+    account = SyntheticAccount(camera_count)
+    entry = SimpleNamespace(
+        entry_id=f"bench_{camera_count}",
+        data={"name": "Bench"},
+        options={
+            "camera_image_refresh_interval": 10,
+            "dom_link": DOM_URL,
+            "username": "123456",
+            "password": "secret",
+        },
+    )
+    background = []
+    entry.async_on_unload = lambda func: None
+    entry.async_create_background_task = (
+        lambda hass_, target, name: background.append(hass_.async_create_background_task(target, name))
+    )
+    entities = {}
+
+    async def forward_entry_setups(config_entry, platforms):
+        for platform in platforms:
+            module = import_module(f"custom_components.ucams.{platform}")
+            await module.async_setup_entry(
+                hass, config_entry, lambda new, _p=platform: entities.setdefault(_p, []).extend(new)
+            )
+
+    hass.config_entries = SimpleNamespace(async_forward_entry_setups=forward_entry_setups)
+
+    with aioresponses() as m:
+        account.mock(m)
+        tracemalloc.start()
+        started = time.perf_counter()
+        assert await async_setup_entry(hass, entry), "setup failed"
+        setup_s = time.perf_counter() - started
+        _, setup_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        data = hass.data[entry.entry_id]
+        cameras_api, dom_api = data["cameras_api"], data["dom_api"]
+        setup_requests = {
+            "ucams": {name: stats.requests for name, stats in cameras_api.metrics.endpoints.items()},
+            "dom": {name: stats.requests for name, stats in dom_api.metrics.endpoints.items()},
+        }
+
+        numbers = [camera["number"] for camera in account.cameras]
+        titles = [camera["title"] for camera in account.cameras]
+        calls = [(numbers[i % len(numbers)],) for i in range(HOT_PATH_CALLS)]
+        url_calls = [(number, SCREEN) for (number,) in calls]
+        result = {
+            "cameras": camera_count,
+            "contracts": len(account.contracts),
+            "skuds": len(account.skuds),
+            "setup_wall_s": round(setup_s, 4),
+            "setup_peak_bytes": setup_peak,
+            "cameras_bytes": _deep_sizeof(cameras_api.cameras),
+            "entities": {platform: len(items) for platform, items in entities.items()},
+            "setup_requests": setup_requests,
+            "latency": {
+                "get_camera_url": await _latency_us(cameras_api.get_camera_url, url_calls),
+                # Первый проход скачивает скриншоты, второй отдаётся из кэша
+                "get_camera_image_cold": await _latency_us(cameras_api.get_camera_image, [(n,) for n in numbers]),
+                "get_camera_image_cached": await _latency_us(cameras_api.get_camera_image, calls),
+                "build_device_name": await _latency_us(
+                    cameras_api.build_device_name, [(titles[i % len(titles)],) for i in range(HOT_PATH_CALLS)]
+                ),
+            },
+        }
+        # Повторный старт из сохранённого состояния: сущности создаются без запросов в облако
+        await data["store"].async_save(cameras_api, dom_api)
+        hass.data.pop(entry.entry_id)
+        await cameras_api.close()
+        await dom_api.close()
+        entities.clear()
+
+        started = time.perf_counter()
+        assert await async_setup_entry(hass, entry), "restored setup failed"
+        result["restored_setup_wall_s"] = round(time.perf_counter() - started, 4)
+        data = hass.data[entry.entry_id]
+        result["restored_setup_requests"] = data["cameras_api"].metrics.requests + data["dom_api"].metrics.requests
+        result["restored_entities"] = {platform: len(items) for platform, items in entities.items()}
+        await asyncio.gather(*background)
+        hass.data.pop(entry.entry_id)
+        await data["cameras_api"].close()
+        await data["dom_api"].close()
+    return result
+
+
+async def main(camera_counts: list[int]) -> dict:
+    from homeassistant.core import HomeAssistant
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir=config_dir)
+        await hass.async_start()
+        try:
+            results = [await run_account(hass, count) for count in camera_counts]
+        finally:
+            await hass.async_stop()
+    return {
+        "benchmark": "ucams_load",
+        "python": sys.version.split()[0],
+        "platforms": [str(platform) for platform in PLATFORMS],
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cameras", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(main(args.cameras)), ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    else:
+        print(report)
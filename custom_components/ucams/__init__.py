@@ -1,14 +1,20 @@
+import asyncio
 import base64
 import logging
 import os
+from time import monotonic
 
 import voluptuous as vol
 from homeassistant.components.camera import ATTR_FILENAME
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform, ATTR_ENTITY_ID
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, SupportsResponse
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
 
+from custom_components.ucams.archive import ArchiveDownloader
 from custom_components.ucams.sensor import ArchiveLinkSensor
+from custom_components.ucams.store import EntryStore
 from custom_components.ucams.ucams import UcamsApi
 from custom_components.ucams.ufanet import DomApi
 from custom_components.ucams.utils import (
@@ -18,7 +24,22 @@ from custom_components.ucams.utils import (
     CONF_USERNAME,
     CONF_PASSWORD,
     CONF_CAMERA_IMAGE_REFRESH_INTERVAL,
-    DOMAIN
+    CONF_CAMERAS_CACHE_TTL,
+    CONF_CAMERAS_PAGE_SIZE,
+    CONF_CAMERAS_CONCURRENT_PAGES,
+    CONF_FFMPEG_MAX_PROCESSES,
+    CONF_HOT_CAMERAS,
+    CONF_CONTRACTS_UPDATE_INTERVAL,
+    ARCHIVE_SEGMENT_DURATION,
+    DEFAULT_CAMERAS_CACHE_TTL,
+    DEFAULT_CAMERAS_PAGE_SIZE,
+    DEFAULT_CAMERAS_CONCURRENT_PAGES,
+    DEFAULT_FFMPEG_MAX_PROCESSES,
+    DEFAULT_CONTRACTS_UPDATE_INTERVAL,
+    DOMAIN,
+    MAX_CAMERAS_PAGE_SIZE,
+    MIN_CONTRACTS_UPDATE_INTERVAL,
+    SNAPSHOT_MAX_PARALLEL,
 )
 
 PLATFORMS: list[str] = [Platform.IMAGE, Platform.CAMERA, Platform.SWITCH, Platform.SENSOR, Platform.BUTTON]
@@ -36,99 +57,336 @@ OPTIONS_SCHEMA = {
     vol.Required(
         CONF_CAMERA_IMAGE_REFRESH_INTERVAL, msg="Refresh interval", default=600
     ): int,
+    vol.Optional(
+        CONF_CAMERAS_CACHE_TTL, msg="Cameras cache TTL", default=DEFAULT_CAMERAS_CACHE_TTL
+    ): int,
+    vol.Optional(
+        CONF_CAMERAS_PAGE_SIZE, msg="Cameras page size", default=DEFAULT_CAMERAS_PAGE_SIZE
+    ): vol.All(int, vol.Range(min=1, max=MAX_CAMERAS_PAGE_SIZE)),
+    vol.Optional(
+        CONF_CAMERAS_CONCURRENT_PAGES, msg="Concurrent page requests", default=DEFAULT_CAMERAS_CONCURRENT_PAGES
+    ): int,
+    vol.Optional(
+        CONF_FFMPEG_MAX_PROCESSES, msg="Concurrent ffmpeg processes", default=DEFAULT_FFMPEG_MAX_PROCESSES
+    ): vol.All(int, vol.Range(min=1)),
+    vol.Optional(CONF_HOT_CAMERAS, msg="Hot cameras", default=""): str,
+    vol.Optional(
+        CONF_CONTRACTS_UPDATE_INTERVAL, msg="Contracts update interval", default=DEFAULT_CONTRACTS_UPDATE_INTERVAL
+    ): vol.All(int, vol.Range(min=MIN_CONTRACTS_UPDATE_INTERVAL)),
 }
 
-ARCHIVE_SCHEMA = vol.Schema({
-    vol.Required(ATTR_ENTITY_ID): str,
+ARCHIVE_WINDOW_SCHEMA = vol.Schema({
     vol.Required("start_time"): int,   # timestamp в UTC
     vol.Required("duration"): int,     # длительность в секундах
 })
 
+ARCHIVE_SCHEMA = vol.Schema(vol.All(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Inclusive("start_time", "window"): int,
+        vol.Inclusive("duration", "window"): int,
+        vol.Optional("windows"): [ARCHIVE_WINDOW_SCHEMA],
+    },
+    cv.has_at_least_one_key("start_time", "windows"),
+))
+
+def filename_template(**sample):
+    """Validate a str.format filename template against the placeholders the service fills in."""
+
+    def validate(value):
+        value = cv.string(value)
+        try:
+            value.format(**sample)
+        except (KeyError, IndexError, ValueError) as e:
+            raise vol.Invalid(f"Invalid filename template {value!r}: {e!r}") from e
+        return value
+
+    return validate
+
+
+def relative_path(value):
+    """Path relative to the service directory, without '..' segments."""
+    value = cv.string(value)
+    if os.path.isabs(value) or ".." in value.replace("\\", "/").split("/"):
+        raise vol.Invalid(f"Filename must be a relative path without '..': {value!r}")
+    return value
+
+
+def per_entity_filename(config: dict) -> dict:
+    """Several cameras must not share one file: the template has to depend on the camera."""
+    if len(config[ATTR_ENTITY_ID]) > 1:
+        template = config[ATTR_FILENAME]
+        first = template.format(entity_id="camera.a", object_id="a", camera_id="1", timestamp="")
+        second = template.format(entity_id="camera.b", object_id="b", camera_id="2", timestamp="")
+        if first == second:
+            raise vol.Invalid(
+                "Filename must contain {entity_id}, {object_id} or {camera_id} when several cameras are given",
+                path=[ATTR_FILENAME],
+            )
+    return config
+
+
+SNAPSHOT_SCHEMA = vol.Schema(vol.All(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        # Шаблон имени файла: {entity_id}, {object_id}, {camera_id}, {timestamp}
+        vol.Required(ATTR_FILENAME): filename_template(
+            entity_id="camera.ucams", object_id="ucams", camera_id="1", timestamp="20240101_000000"
+        ),
+        vol.Optional("max_parallel", default=SNAPSHOT_MAX_PARALLEL): vol.All(int, vol.Range(min=1)),
+    },
+    per_entity_filename,
+))
+
+DOWNLOAD_ARCHIVE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Required("start_time"): int,   # timestamp в UTC
+    vol.Required("duration"): vol.All(int, vol.Range(min=1)),
+    # Шаблон имени файла относительно media/ucams: {object_id}, {camera_id}, {start_time}, {duration}
+    vol.Optional("filename"): vol.All(
+        relative_path, filename_template(object_id="ucams", camera_id="1", start_time=0, duration=1)
+    ),
+})
+
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
+    _LOGGER.info(["async_setup_entry", config_entry.entry_id, config_entry.data, config_entry.options])
+    ufanet_api = DomApi(hass, config_entry)
+    cameras_api = UcamsApi(hass, config_entry, ufanet_api)
+    store = EntryStore(hass, config_entry.entry_id)
     try:
-        _LOGGER.info(["async_setup_entry", config_entry.entry_id, config_entry.data, config_entry.options])
-        ufanet_api = DomApi(hass, config_entry)
-        cameras_api = UcamsApi(hass, config_entry, ufanet_api)
-        cameras_info = await cameras_api.get_cameras_info()
+        # Сохранённый список камер позволяет создать сущности без ожидания облака
+        restored = await store.async_restore(cameras_api, ufanet_api)
+        if restored:
+            cameras_info = cameras_api.inventory.cameras
+        else:
+            cameras_info = await cameras_api.inventory.async_get()
+            store.async_schedule_save(cameras_api, ufanet_api)
+        await cameras_api.async_prepare_device_names(camera["title"] for camera in cameras_info.values())
         hass.data[config_entry.entry_id] = {
             "cameras_api": cameras_api,
             "dom_api": ufanet_api,
-            "cameras_info": cameras_info
+            "inventory": cameras_api.inventory,
+            "cameras_info": cameras_info,
+            "store": store,
         }
         await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+        if restored:
+            config_entry.async_create_background_task(
+                hass, _async_reconcile(hass, config_entry, store), f"{DOMAIN} reconcile {config_entry.entry_id}"
+            )
         return True
     except Exception as e:
         _LOGGER.error(f"❌ Ошибка загрузки UCAMS: {e}")
+        hass.data.pop(config_entry.entry_id, None)
+        await cameras_api.close()
+        await ufanet_api.close()
         return False
 
 
+async def _async_reconcile(hass: HomeAssistant, config_entry: ConfigEntry, store: EntryStore) -> None:
+    """Refresh the stored inventory from the cloud; reload the entry if cameras or SKUDs changed."""
+    data = hass.data[config_entry.entry_id]
+    cameras_api, dom_api = data["cameras_api"], data["dom_api"]
+    known_cameras = set(cameras_api.cameras)
+    known_skud = {skud["id"] for skud in dom_api.shared_skud or []}
+    try:
+        await cameras_api.inventory.async_get(force=True)
+        skud_list = await dom_api.get_shared_skud()
+    except Exception as e:
+        _LOGGER.warning("Background refresh failed, keeping the stored camera list: %s", e)
+        return
+    store.async_schedule_save(cameras_api, dom_api)
+    current_cameras = set(cameras_api.cameras)
+    if current_cameras != known_cameras or {skud["id"] for skud in skud_list} != known_skud:
+        _LOGGER.info("Camera or SKUD list changed, reloading ucams entry")
+        hass.config_entries.async_schedule_reload(config_entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     res = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
     if res:
-        del hass.data[config_entry.entry_id]
+        data = hass.data.pop(config_entry.entry_id)
+        try:
+            await data["store"].async_save(data["cameras_api"], data["dom_api"])
+        finally:
+            await data["cameras_api"].close()
+            await data["dom_api"].close()
     return res
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    await EntryStore(hass, config_entry.entry_id).async_remove()
+
+
 async def async_setup(hass: HomeAssistant, config_entry: ConfigEntry):
     # Регистрация сервиса для создания снимков
 
-    async def handle_snapshot_service(call):
-        entity_id = call.data.get(ATTR_ENTITY_ID)
-        if isinstance(entity_id, list):
-            entity_id = entity_id[0]
+    def _write_image(to_file: str, image_data: bytes) -> None:
+        """Executor helper to write image."""
+        if os.path.dirname(to_file):
+            os.makedirs(os.path.dirname(to_file), exist_ok=True)
+        with open(to_file, "wb") as img_file:
+            img_file.write(image_data)
+
+    async def _snapshot(entity_id: str, filename_template: str, timestamp: str, semaphore: asyncio.Semaphore) -> dict:
+        """Take one snapshot; a failed camera falls back to the placeholder image on its own."""
         camera = hass.data["camera"].get_entity(entity_id)
         _LOGGER.debug(f"Entity ID: {entity_id}, Camera: {camera}")
-        filename = call.data[ATTR_FILENAME]
-        default_image = base64.b64decode(NO_SNAPSHOT_IMG)
+        if camera is None or not hasattr(camera, "handle_snapshot_from_rtsp"):
+            return {"success": False, "error": "camera not found"}
+        filename = filename_template.format(
+            entity_id=entity_id,
+            object_id=entity_id.split(".", 1)[-1],
+            camera_id=camera.camera_id,
+            timestamp=timestamp,
+        )
+        result = {"filename": filename, "fallback": False}
+        started = monotonic()
         image = None
-        try:
-            image = await camera.handle_snapshot_from_rtsp()
-            if image is None:
-                _LOGGER.warning("Can't find fallback image")
-        except Exception as e:
-            _LOGGER.error("Error %s while getting snapshot.", e)
-
-        image = image if image is not None else default_image
-
-        def _write_image(to_file: str, image_data: bytes) -> None:
-            """Executor helper to write image."""
-            # Если image_data None, подставляем байты из NO_SNAPSHOT_IMG
-
-            os.makedirs(os.path.dirname(to_file), exist_ok=True)
-            with open(to_file, "wb") as img_file:
-                img_file.write(image_data)
+        async with semaphore:
+            try:
+                image = await camera.handle_snapshot_from_rtsp()
+                if image is None:
+                    _LOGGER.warning("Can't find fallback image")
+            except Exception as e:
+                _LOGGER.error("Error %s while getting snapshot.", e)
+                result["error"] = str(e)
+        if image is None:
+            image = base64.b64decode(NO_SNAPSHOT_IMG)
+            result["fallback"] = True
 
         try:
             await hass.async_add_executor_job(_write_image, filename, image)
+            result["success"] = True
         except OSError as err:
             _LOGGER.error("Can't write image to file: %s", err)
+            result["success"] = False
+            result["error"] = str(err)
+        result["duration"] = round(monotonic() - started, 3)
+        return result
+
+    async def handle_snapshot_service(call):
+        entity_ids = call.data[ATTR_ENTITY_ID]
+        semaphore = asyncio.Semaphore(call.data["max_parallel"])
+        timestamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+        started = monotonic()
+        results = await asyncio.gather(*(
+            _snapshot(entity_id, call.data[ATTR_FILENAME], timestamp, semaphore)
+            for entity_id in entity_ids
+        ))
+        return {
+            "results": dict(zip(entity_ids, results)),
+            "duration": round(monotonic() - started, 3),
+        }
 
     async def handle_archive_service(call):
-        """ Get archive link for camera """
-        entity_id = call.data.get(ATTR_ENTITY_ID)
-        if isinstance(entity_id, list):
-            entity_id = entity_id[0]
+        """ Get archive links for cameras and time windows """
+        windows = list(call.data.get("windows", []))
+        if "start_time" in call.data:
+            windows.append({"start_time": call.data["start_time"], "duration": call.data["duration"]})
+
+        # Группируем камеры по API записи, чтобы запросить все окна минимальным числом запросов
+        cameras = {}
+        by_api = {}
+        for entity_id in call.data[ATTR_ENTITY_ID]:
+            camera = hass.data["camera"].get_entity(entity_id)
+            _LOGGER.debug(f"Entity ID: {entity_id}, Camera: {camera}")
+            if camera is None or not hasattr(camera, "cameras_api"):
+                _LOGGER.error("Камера %s не найдена", entity_id)
+                continue
+            cameras[entity_id] = camera
+            by_api.setdefault(id(camera.cameras_api), (camera.cameras_api, []))[1].extend(
+                (camera.camera_id, window["start_time"], window["duration"]) for window in windows
+            )
+
+        archive_urls = {}
+        for cameras_api, requested in by_api.values():
+            archive_urls.update(await cameras_api.get_cameras_archive(requested))
+
+        results = {}
+        for entity_id, camera in cameras.items():
+            results[entity_id] = []
+            for window in windows:
+                archive_url = archive_urls.get((camera.camera_id, window["start_time"], window["duration"]))
+                results[entity_id].append({**window, "url": archive_url})
+                if not archive_url:
+                    _LOGGER.error("Не удалось получить архив для камеры %s", entity_id)
+                    continue
+                _LOGGER.info("Получена ссылка на архив: %s", archive_url)
+                sensor = hass.data[camera.config_entry_id].get("archive_link_sensors", {}).get(camera.camera_id)
+                if sensor:
+                    sensor.update_link(archive_url)
+        return {"results": results}
+
+    async def _download_archive(entity_id: str, start_time: int, duration: int, filename_template: str | None) -> dict:
         camera = hass.data["camera"].get_entity(entity_id)
-        _LOGGER.debug(f"Entity ID: {entity_id}, Camera: {camera}")
-        start_time = call.data.get("start_time")
-        duration = call.data.get("duration")
-        config_entry_id = camera.config_entry_id
-        data = hass.data[config_entry_id]
-
-        archive_url = await camera.get_camera_archive(start_time, duration)
-        if archive_url:
-            _LOGGER.info("Получена ссылка на архив: %s", archive_url)
-            sensor = data["archive_link_sensors"].get(camera.camera_id)
+        if camera is None or not hasattr(camera, "cameras_api"):
+            return {"success": False, "error": "camera not found"}
+        object_id = entity_id.split(".", 1)[-1]
+        extension = ".mp4" if duration <= ARCHIVE_SEGMENT_DURATION else ".ts"
+        filename = (filename_template or "{object_id}_{start_time}_{duration}" + extension).format(
+            object_id=object_id, camera_id=camera.camera_id, start_time=start_time, duration=duration,
+        )
+        media_dir = hass.config.media_dirs.get("local") or hass.config.path("media")
+        base_dir = os.path.realpath(os.path.join(media_dir, DOMAIN))
+        path = os.path.realpath(os.path.join(base_dir, filename))
+        # Схема уже отсекла '..', но подставленные значения и симлинки проверяем по итоговому пути
+        if os.path.commonpath([base_dir, path]) != base_dir or not hass.config.is_allowed_path(path):
+            _LOGGER.error("Путь %s вне %s или не разрешён", path, base_dir)
+            return {"success": False, "path": path, "error": "path not allowed"}
+        sensor = hass.data[camera.config_entry_id].get("archive_link_sensors", {}).get(camera.camera_id)
+
+        def _progress(downloaded: int, total: int) -> None:
             if sensor:
-                sensor.update_link(archive_url)
-        else:
-            _LOGGER.error("Не удалось получить архив для камеры %s", entity_id)
+                sensor.update_download("downloading", downloaded, total, path)
+
+        started = monotonic()
+        try:
+            size = await ArchiveDownloader(hass, camera.cameras_api).async_download(
+                camera.camera_id, start_time, duration, path, _progress
+            )
+        except Exception as e:
+            _LOGGER.error("Не удалось скачать архив для камеры %s: %s", entity_id, e)
+            if sensor:
+                sensor.update_download("failed", path=path)
+            return {"success": False, "path": path, "error": str(e)}
+        if sensor:
+            sensor.update_download("done", size, size, path)
+        return {"success": True, "path": path, "size": size, "duration": round(monotonic() - started, 3)}
+
+    async def handle_download_archive_service(call):
+        """ Download archive of cameras to the media directory """
+        entity_ids = call.data[ATTR_ENTITY_ID]
+        results = await asyncio.gather(*(
+            _download_archive(entity_id, call.data["start_time"], call.data["duration"], call.data.get("filename"))
+            for entity_id in entity_ids
+        ))
+        return {"results": dict(zip(entity_ids, results))}
 
-    hass.services.async_register(DOMAIN, "get_archive", handle_archive_service, schema=ARCHIVE_SCHEMA)
+    hass.services.async_register(
+        DOMAIN,
+        "download_archive",
+        handle_download_archive_service,
+        schema=DOWNLOAD_ARCHIVE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_archive",
+        handle_archive_service,
+        schema=ARCHIVE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
 
-    hass.services.async_register(DOMAIN, "snapshot", handle_snapshot_service)
+    hass.services.async_register(
+        DOMAIN,
+        "snapshot",
+        handle_snapshot_service,
+        schema=SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
     return True
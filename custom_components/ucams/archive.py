@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from time import monotonic
+
+from aiohttp import ClientTimeout
+from homeassistant.core import HomeAssistant
+from yarl import URL
+
+from custom_components.ucams.metrics import instrumented_request
+from custom_components.ucams.utils import (
+    ARCHIVE_CHUNK_SIZE,
+    ARCHIVE_MAX_PARALLEL_SEGMENTS,
+    ARCHIVE_SEGMENT_DURATION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Без общего тайм-аута: архив за несколько часов скачивается долго
+DOWNLOAD_TIMEOUT = ClientTimeout(total=None, sock_connect=30, sock_read=60)
+
+
+def split_window(start_time: int, duration: int) -> list[tuple[int, int]]:
+    """Split an archive window into segments no longer than ARCHIVE_SEGMENT_DURATION."""
+    return [
+        (segment_start, min(ARCHIVE_SEGMENT_DURATION, start_time + duration - segment_start))
+        for segment_start in range(start_time, start_time + duration, ARCHIVE_SEGMENT_DURATION)
+    ]
+
+
+class ArchiveDownloader:
+    """Streams camera archive to local files.
+
+    Data is written in fixed-size chunks, interrupted downloads resume from their
+    ``.part`` file with an HTTP Range request, windows longer than one segment are
+    fetched in parallel as MPEG-TS segments and joined, and the result appears
+    under its final name only when complete.
+    """
+
+    def __init__(self, hass: HomeAssistant, cameras_api):
+        self.hass = hass
+        self.cameras_api = cameras_api
+
+    async def async_download(self, camera_id: str, start_time: int, duration: int, path: str, progress=None) -> int:
+        """Download the window to ``path`` and return the file size."""
+        segments = split_window(start_time, duration)
+        windows = [(camera_id, segment_start, segment_duration) for segment_start, segment_duration in segments]
+        archive_urls = await self.cameras_api.get_cameras_archive(windows)
+        urls = []
+        for window in windows:
+            if not archive_urls.get(window):
+                raise ValueError(f"Archive link not available for camera {camera_id} window {window[1:]}")
+            url = URL(archive_urls[window])
+            if len(segments) > 1 and url.path.endswith(".mp4"):
+                # MPEG-TS сегменты можно склеить побайтно, mp4 — нет
+                url = url.with_path(url.path[:-4] + ".ts").with_query(url.query)
+            urls.append(url)
+
+        await self.hass.async_add_executor_job(_makedirs, path)
+        state = {"downloaded": 0, "total": 0, "reported_at": 0.0}
+        semaphore = asyncio.Semaphore(ARCHIVE_MAX_PARALLEL_SEGMENTS)
+
+        def _report(delta_downloaded: int, delta_total: int = 0, force: bool = False):
+            state["downloaded"] += delta_downloaded
+            state["total"] += delta_total
+            now = monotonic()
+            if progress and (force or now - state["reported_at"] >= 1):
+                state["reported_at"] = now
+                progress(state["downloaded"], state["total"])
+
+        async def _fetch(index: int, url: URL) -> str:
+            part_path = f"{path}.part{index}"
+            async with semaphore:
+                await self._download_segment(url, part_path, _report)
+            return part_path
+
+        parts = await asyncio.gather(*(_fetch(index, url) for index, url in enumerate(urls)))
+        size = await self.hass.async_add_executor_job(_assemble, parts, path)
+        # Content-Length известен не всегда, по завершении итог равен скачанному
+        state["total"] = state["downloaded"]
+        _report(0, force=True)
+        return size
+
+    async def _download_segment(self, url: URL, part_path: str, report) -> None:
+        session = await self.cameras_api.get_authenticated_session()
+        offset = await self.hass.async_add_executor_job(_file_size, part_path)
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with instrumented_request(
+                session, self.cameras_api.metrics, "GET", url, endpoint="GET archive",
+                headers=headers, timeout=DOWNLOAD_TIMEOUT,
+        ) as resp:
+            if resp.status == 416 and offset:
+                # Сервер сообщает, что докачивать нечего
+                report(offset, offset)
+                return
+            resp.raise_for_status()
+            if resp.status != 206:
+                offset = 0
+            report(offset, offset + (resp.content_length or 0))
+            handle = await self.hass.async_add_executor_job(open, part_path, "ab" if offset else "wb")
+            try:
+                async for chunk in resp.content.iter_chunked(ARCHIVE_CHUNK_SIZE):
+                    await self.hass.async_add_executor_job(handle.write, chunk)
+                    report(len(chunk))
+            finally:
+                await self.hass.async_add_executor_job(handle.close)
+
+
+def _makedirs(path: str) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _assemble(parts: list[str], path: str) -> int:
+    """Join segment files and atomically move the result to ``path``."""
+    if len(parts) == 1:
+        os.replace(parts[0], path)
+        return os.path.getsize(path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as target:
+        for part in parts:
+            with open(part, "rb") as source:
+                while chunk := source.read(ARCHIVE_CHUNK_SIZE):
+                    target.write(chunk)
+    os.replace(tmp_path, path)
+    for part in parts:
+        os.remove(part)
+    return os.path.getsize(path)
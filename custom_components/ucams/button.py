@@ -4,7 +4,7 @@ from homeassistant.components.button import ButtonEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo
 
-from custom_components.ucams.utils import DOMAIN
+from custom_components.ucams.utils import ARCHIVE_WINDOW_BUCKET, DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,6 +19,7 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         _LOGGER.error("cameras_info не найден")
         return
 
+    await cameras_api.async_prepare_device_names(camera["title"] for camera in cameras_info.values())
     buttons = []
     for camera in cameras_info.values():
         device_name = camera["title"]
@@ -62,8 +63,9 @@ class ArchiveButton(ButtonEntity):
 
     async def async_press(self):
         """Press the button."""
-        # Вычисляем время начала архива: текущий момент минус длительность
-        start_time = int(time.time()) - self._duration
+        # Вычисляем время начала архива: текущий момент минус длительность.
+        # Начало округляется до корзины, чтобы повторные нажатия брали ссылку из кэша
+        start_time = (int(time.time()) - self._duration) // ARCHIVE_WINDOW_BUCKET * ARCHIVE_WINDOW_BUCKET
         _LOGGER.debug(
             "Нажата кнопка '%s' для камеры %s: start_time=%d, duration=%d",
             self._label, self._camera_id, start_time, self._duration
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic, time
+
+
+@dataclass
+class Screenshot:
+    content: bytes
+    fetched_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return monotonic() - self.fetched_at < ttl
+
+    def validators(self) -> dict:
+        """Headers for a conditional request that revalidates this screenshot."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ScreenshotCache:
+    """LRU cache of camera screenshots limited by the total size of stored images."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, Screenshot] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, camera_id: str) -> Screenshot | None:
+        item = self._items.get(camera_id)
+        if item is not None:
+            self._items.move_to_end(camera_id)
+        return item
+
+    def put(self, camera_id: str, content: bytes, etag: str | None = None, last_modified: str | None = None):
+        self.pop(camera_id)
+        if len(content) > self.max_bytes:
+            return
+        self._items[camera_id] = Screenshot(content, monotonic(), etag, last_modified)
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted.content)
+
+    def touch(self, camera_id: str):
+        """Mark a screenshot as fresh after a successful revalidation."""
+        item = self.get(camera_id)
+        if item is not None:
+            item.fetched_at = monotonic()
+
+    def pop(self, camera_id: str):
+        item = self._items.pop(camera_id, None)
+        if item is not None:
+            self.size -= len(item.content)
+
+
+class ArchiveUrlCache:
+    """Archive links keyed by ``(camera_id, start_time, duration)`` until their token_d expires."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: tuple) -> str | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        url, expires_at = item
+        if time() >= expires_at:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return url
+
+    def put(self, key: tuple, url: str, expires_at: float):
+        self._items[key] = (url, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
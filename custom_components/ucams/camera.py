@@ -1,8 +1,5 @@
 import datetime
 import logging
-import re
-import shlex
-import subprocess
 
 from homeassistant.components.camera import (
     Camera,
@@ -15,7 +12,18 @@ from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.util.dt import now
 
 from . import UcamsApi
-from .utils import TOKEN_REFRESH_BUFFER, DOMAIN
+from .ffmpeg import FFmpegSnapshotRunner, KeyframeGrabber
+from .utils import (
+    CONF_FFMPEG_MAX_PROCESSES,
+    CONF_HOT_CAMERAS,
+    DEFAULT_FFMPEG_MAX_PROCESSES,
+    KEYFRAME_BUFFER_SIZE,
+    KEYFRAME_MAX_AGE,
+    SNAPSHOT_TIMEOUT,
+    TOKEN_REFRESH_BUFFER,
+    DOMAIN,
+    parse_hot_cameras,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,9 +31,19 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     cameras_api = hass.data[config_entry.entry_id]["cameras_api"]
-    cameras_info = await cameras_api.get_cameras_info()
+    cameras_info = hass.data[config_entry.entry_id]["inventory"].cameras
+    snapshot_runner = FFmpegSnapshotRunner(
+        max(config_entry.options.get(CONF_FFMPEG_MAX_PROCESSES, DEFAULT_FFMPEG_MAX_PROCESSES), 1),
+        SNAPSHOT_TIMEOUT,
+    )
+    hass.data[config_entry.entry_id]["snapshot_runner"] = snapshot_runner
+    hot_cameras = parse_hot_cameras(config_entry.options.get(CONF_HOT_CAMERAS))
+    await cameras_api.async_prepare_device_names(camera_info["title"] for camera_info in cameras_info.values())
     entities = [
-        Ucams(hass, config_entry, cameras_api, camera_info)
+        Ucams(
+            hass, config_entry, cameras_api, camera_info, snapshot_runner,
+            hot=str(camera_info["id"]) in hot_cameras,
+        )
         for camera_info in cameras_info.values()
     ]
     async_add_entities(entities)
@@ -37,19 +55,19 @@ class Ucams(Camera):
             hass: HomeAssistant,
             config_entry: ConfigEntry,
             cameras_api: UcamsApi,
-            camera_info: dict
+            camera_info: dict,
+            snapshot_runner: FFmpegSnapshotRunner,
+            hot: bool = False,
     ) -> None:
         super().__init__()
 
         self.hass = hass
         self.config_entry_id = config_entry.entry_id
         self.cameras_api = cameras_api
+        self.snapshot_runner = snapshot_runner
         self.camera_id = camera_info["id"]
         self.device_name = cameras_api.build_device_name(camera_info["title"])
-        device_slug = re.sub(r"[^a-z0-9]+", "_", self.device_name.lower()).strip("_")
-        camera_slug = re.sub(r"[^a-z0-9]+", "_", str(self.camera_id).lower()).strip("_")
-        object_id = f"{device_slug}_{camera_slug}" if camera_slug else device_slug
-        self.entity_id = f"camera.{object_id}"
+        self.entity_id = f"camera.{cameras_api.build_object_id(camera_info['title'], self.camera_id)}"
 
         self._attr_unique_id = f"camera-{self.camera_id}"
         self._attr_name = self.device_name
@@ -60,6 +78,15 @@ class Ucams(Camera):
             datetime.timedelta(seconds=TOKEN_REFRESH_BUFFER),
         )
         self._entity_picture = None
+        self._grabber = None
+        self._remove_token_listener = None
+        if hot:
+            self._grabber = KeyframeGrabber(
+                hass,
+                self.camera_id,
+                lambda: self.cameras_api.get_camera_stream_url(self.camera_id),
+                KEYFRAME_BUFFER_SIZE,
+            )
 
     async def _stream_refresh(self, now: datetime.datetime) -> None:
         _LOGGER.debug(
@@ -70,9 +97,22 @@ class Ucams(Camera):
             _LOGGER.debug("Updating camera %s stream source to %s", self.camera_id, url)
             self.stream.update_source(url)
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._grabber:
+            self._remove_token_listener = self.cameras_api.async_add_token_listener(
+                self.camera_id, self._grabber.restart
+            )
+            self._grabber.start()
+
     async def async_will_remove_from_hass(self) -> None:
         if self._stream_refresh_cancel_fn:
             self._stream_refresh_cancel_fn()
+        if self._remove_token_listener:
+            self._remove_token_listener()
+            self._remove_token_listener = None
+        if self._grabber:
+            await self._grabber.stop()
 
     async def stream_source(self) -> str | None:
         url = await self.cameras_api.get_camera_stream_url(self.camera_id)
@@ -82,6 +122,8 @@ class Ucams(Camera):
     async def async_camera_image(
             self, width: int | None = None, height: int | None = None
     ) -> bytes | None:
+        if self._grabber and (frame := self._grabber.latest(KEYFRAME_MAX_AGE)):
+            return frame
         return await _async_get_stream_image(self, wait_for_next_keyframe=True)
 
     async def async_update(self):
@@ -93,6 +135,16 @@ class Ucams(Camera):
         """ Return the camera image URL. """
         return self._entity_picture
 
+    @property
+    def extra_state_attributes(self) -> dict:
+        stats = self.snapshot_runner.stats.get(self.camera_id)
+        if not stats:
+            return {}
+        return {
+            "snapshot_latency": stats["last_latency"],
+            "snapshot_cpu_time": stats["last_cpu_time"],
+        }
+
     @property
     def device_info(self) -> DeviceInfo:
         return {
@@ -105,52 +157,15 @@ class Ucams(Camera):
         """
         Get snapshot from RTSP stream.
         """
+        if self._grabber and (frame := self._grabber.latest(KEYFRAME_MAX_AGE)):
+            return frame
+
         rtsp_url = await self.cameras_api.get_camera_stream_url(self.camera_id)  # Получение RTSP URL потока
         if not rtsp_url:
             _LOGGER.error("RTSP URL не найден для камеры %s", self.camera_id)
             return None
 
-        command = (
-            f"ffmpeg -i {shlex.quote(rtsp_url)} -vf 'select=eq(n\\,0)' "
-            f"-vframes 1 -q:v 2 -f image2 -"
-        )
-
-        _LOGGER.debug("Выполняется команда FFmpeg для RTSP: %s", command)
-
-        # Запуск FFmpeg процесса
-        ffmpeg_cmd = subprocess.Popen(
-            shlex.split(command),
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-
-        try:
-            output_stream, error_stream = ffmpeg_cmd.communicate(timeout=15)  # Тайм-аут 15 секунд
-
-            if ffmpeg_cmd.returncode != 0:
-                _LOGGER.error(
-                    "Ошибка FFmpeg для камеры %s: %s",
-                    self.camera_id,
-                    error_stream.decode()
-                )
-                return None
-
-            _LOGGER.info("Снимок успешно получен для камеры %s", self.camera_id)
-            return output_stream
-
-        except subprocess.TimeoutExpired:
-            _LOGGER.error("FFmpeg для камеры %s превысил тайм-аут", self.camera_id)
-            ffmpeg_cmd.terminate()
-            return None
-
-        except Exception as e:
-            _LOGGER.error("Ошибка при выполнении FFmpeg для камеры %s: %s", self.camera_id, e)
-            return None
-
-        finally:
-            ffmpeg_cmd.terminate()
-            ffmpeg_cmd.wait()
+        return await self.snapshot_runner.async_snapshot(self.camera_id, rtsp_url)
 
     async def get_camera_archive(self, start_time, duration):
         archive_url = await self.cameras_api.get_camera_archive(self.camera_id, start_time, duration)
@@ -0,0 +1,29 @@
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from custom_components.ucams.utils import (
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_LIMIT,
+    HTTP_LIMIT_PER_HOST,
+    TIMEOUT,
+)
+
+
+def create_session(headers: dict, trust_env: bool = False) -> ClientSession:
+    """Create an HTTP session tuned for many screenshot and flussonic hosts.
+
+    The session owns its connector; the API that created it must close it on unload.
+    Authorization is passed per request and never stored in the session headers.
+    """
+    connector = TCPConnector(
+        limit=HTTP_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    return ClientSession(
+        connector=connector,
+        headers=headers,
+        timeout=ClientTimeout(total=TIMEOUT),
+        trust_env=trust_env,
+    )
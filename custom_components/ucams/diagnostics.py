@@ -0,0 +1,45 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .utils import CONF_PASSWORD, CONF_USERNAME
+
+TO_REDACT = {
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    "token",
+    "token_l",
+    "access",
+    "refresh",
+    "url_video",
+    "url_ws_video",
+    "url_screen",
+}
+
+
+def _api_diagnostics(api) -> dict:
+    return {
+        "token_expiration": api.token_expiration,
+        "token_refresh_count": api.token_refresh_count,
+        "metrics": api.metrics.as_dict(),
+        "request_policy": api.policy.as_dict(),
+    }
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    data = hass.data[config_entry.entry_id]
+    cameras_api = data["cameras_api"]
+    return {
+        "entry": {
+            "data": async_redact_data(dict(config_entry.data), TO_REDACT),
+            "options": async_redact_data(dict(config_entry.options), TO_REDACT),
+        },
+        "cameras_api": {
+            **_api_diagnostics(cameras_api),
+            "cams_server": cameras_api.cams_server,
+            "cameras": async_redact_data(
+                {camera_id: camera.as_dict() for camera_id, camera in cameras_api.cameras.items()}, TO_REDACT
+            ),
+        },
+        "dom_api": _api_diagnostics(data["dom_api"]),
+    }
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import re
+from collections import deque
+from time import monotonic
+
+_LOGGER = logging.getLogger(__name__)
+
+BENCH_RE = re.compile(r"bench: utime=([\d.]+)s stime=([\d.]+)s")
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+KEYFRAME_STABLE_RUN = 60
+KEYFRAME_MAX_BACKOFF = 60
+# Больше кадра 600p быть не может; без EOI буфер дальше не растёт
+KEYFRAME_MAX_FRAME_SIZE = 4 * 1024 * 1024
+
+
+class FFmpegSnapshotRunner:
+    """Grabs single frames from RTSP streams with ffmpeg without blocking the event loop.
+
+    The number of simultaneous ffmpeg processes is limited by a semaphore, and
+    wall time and CPU time of the last snapshot are recorded per camera.
+    """
+
+    def __init__(self, max_processes: int, timeout: float, binary: str = "ffmpeg"):
+        self.timeout = timeout
+        self.binary = binary
+        self.stats: dict[str, dict] = {}
+        self._semaphore = asyncio.Semaphore(max_processes)
+
+    def _command(self, rtsp_url: str) -> list[str]:
+        return [
+            self.binary,
+            "-hide_banner",
+            "-benchmark",
+            "-i", rtsp_url,
+            "-vf", "select=eq(n\\,0)",
+            "-vframes", "1",
+            "-q:v", "2",
+            "-f", "image2",
+            "-",
+        ]
+
+    async def async_snapshot(self, camera_id: str, rtsp_url: str) -> bytes | None:
+        async with self._semaphore:
+            started = monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self._command(rtsp_url),
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                _LOGGER.error("Не удалось запустить FFmpeg для камеры %s: %s", camera_id, e)
+                return None
+
+            try:
+                output_stream, error_stream = await asyncio.wait_for(process.communicate(), self.timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.error("FFmpeg для камеры %s превысил тайм-аут", camera_id)
+                await self._kill(process)
+                self._record(camera_id, started, None, ok=False)
+                return None
+            except asyncio.CancelledError:
+                await self._kill(process)
+                raise
+
+            self._record(camera_id, started, error_stream, ok=process.returncode == 0 and bool(output_stream))
+            if process.returncode != 0:
+                _LOGGER.error(
+                    "Ошибка FFmpeg для камеры %s: %s",
+                    camera_id,
+                    error_stream.decode(errors="replace")
+                )
+                return None
+
+            _LOGGER.info("Снимок успешно получен для камеры %s", camera_id)
+            return output_stream
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+    def _record(self, camera_id: str, started: float, error_stream: bytes | None, ok: bool) -> None:
+        cpu_time = None
+        if error_stream:
+            match = BENCH_RE.search(error_stream.decode(errors="replace"))
+            if match:
+                cpu_time = round(float(match.group(1)) + float(match.group(2)), 3)
+        stats = self.stats.setdefault(camera_id, {"count": 0, "failures": 0})
+        stats["count"] += 1
+        if not ok:
+            stats["failures"] += 1
+        stats["last_latency"] = round(monotonic() - started, 3)
+        stats["last_cpu_time"] = cpu_time
+        _LOGGER.debug("Snapshot stats for camera %s: %s", camera_id, stats)
+
+
+class KeyframeGrabber:
+    """Keeps an ffmpeg process attached to one RTSP stream and holds its latest keyframes.
+
+    Only keyframes are decoded and re-encoded as JPEG, the most recent ones stay in a
+    small in-memory ring. The process is restarted with backoff when it exits and
+    on demand via ``restart()`` (e.g. when the stream token rotates).
+    """
+
+    def __init__(
+        self,
+        hass,
+        camera_id: str,
+        url_provider,
+        buffer_size: int,
+        binary: str = "ffmpeg",
+    ):
+        self.hass = hass
+        self.camera_id = camera_id
+        self.binary = binary
+        self.frames: deque[tuple[float, bytes]] = deque(maxlen=buffer_size)
+        self.restarts = 0
+        self._url_provider = url_provider
+        self._process: asyncio.subprocess.Process | None = None
+        self._task: asyncio.Task | None = None
+
+    def _command(self, rtsp_url: str) -> list[str]:
+        return [
+            self.binary,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-rtsp_transport", "tcp",
+            "-skip_frame", "nokey",
+            "-i", rtsp_url,
+            "-an",
+            "-vsync", "0",
+            "-q:v", "5",
+            "-f", "image2pipe",
+            "-c:v", "mjpeg",
+            "-",
+        ]
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = self.hass.async_create_background_task(
+                self._supervise(), f"ucams keyframe grabber {self.camera_id}"
+            )
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def restart(self) -> None:
+        """Drop the current process, the supervisor starts a new one with a fresh URL."""
+        if self._process and self._process.returncode is None:
+            self._process.kill()
+
+    def latest(self, max_age: float) -> bytes | None:
+        if not self.frames:
+            return None
+        received_at, frame = self.frames[-1]
+        if monotonic() - received_at > max_age:
+            return None
+        return frame
+
+    async def _supervise(self) -> None:
+        backoff = 1
+        while True:
+            started = monotonic()
+            try:
+                rtsp_url = await self._url_provider()
+                if rtsp_url:
+                    await self._run(rtsp_url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _LOGGER.warning("Keyframe grabber for camera %s failed: %s", self.camera_id, e)
+            self.restarts += 1
+            if monotonic() - started > KEYFRAME_STABLE_RUN:
+                backoff = 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, KEYFRAME_MAX_BACKOFF)
+
+    async def _run(self, rtsp_url: str) -> None:
+        self._process = process = await asyncio.create_subprocess_exec(
+            *self._command(rtsp_url),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        buffer = bytearray()
+        try:
+            while chunk := await process.stdout.read(65536):
+                buffer += chunk
+                self._extract_frames(buffer)
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+            self._process = None
+
+    def _extract_frames(self, buffer: bytearray) -> None:
+        while True:
+            start = buffer.find(JPEG_SOI)
+            if start < 0:
+                buffer.clear()
+                return
+            end = buffer.find(JPEG_EOI, start + 2)
+            if end < 0:
+                del buffer[:start]
+                if len(buffer) > KEYFRAME_MAX_FRAME_SIZE:
+                    # Поток не закрыл кадр: оставляем только последний начатый, если он не слишком велик
+                    last = buffer.rfind(JPEG_SOI, 2)
+                    if last > 0:
+                        del buffer[:last]
+                    if len(buffer) > KEYFRAME_MAX_FRAME_SIZE:
+                        buffer.clear()
+                return
+            self.frames.append((monotonic(), bytes(buffer[start:end + 2])))
+            del buffer[:end + 2]
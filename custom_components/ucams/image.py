@@ -1,26 +1,106 @@
 import asyncio
-import re
-from datetime import datetime
+import logging
+import random
+import zlib
 
 from homeassistant.components.image import ImageEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
 
 from . import CONF_CAMERA_IMAGE_REFRESH_INTERVAL, UcamsApi
-from .utils import DOMAIN
+from .utils import DOMAIN, IMAGE_REFRESH_JITTER, IMAGE_REFRESH_MAX_IN_FLIGHT
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     cameras_api = hass.data[config_entry.entry_id]["cameras_api"]
-    cameras_info = await cameras_api.get_cameras_info()
+    cameras_info = hass.data[config_entry.entry_id]["inventory"].cameras
+    scheduler = ImageRefreshScheduler(
+        hass, cameras_api, config_entry.options[CONF_CAMERA_IMAGE_REFRESH_INTERVAL]
+    )
+    hass.data[config_entry.entry_id]["image_refresh_scheduler"] = scheduler
+    await cameras_api.async_prepare_device_names(camera_info["title"] for camera_info in cameras_info.values())
     entities = [
-        UcamsCameraImageEntity(hass, config_entry, cameras_api, camera_info)
+        UcamsCameraImageEntity(hass, config_entry, cameras_api, camera_info, scheduler)
         for camera_info in cameras_info.values()
     ]
     async_add_entities(entities)
 
 
+class ImageRefreshScheduler:
+    """Refreshes all image entities of a config entry, spread evenly over the interval.
+
+    Each camera gets a stable phase inside the interval plus a small jitter, keeps
+    exactly one pending refresh, and at most ``max_in_flight`` screenshots are
+    downloaded at the same time.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        cameras_api: UcamsApi,
+        interval: int,
+        max_in_flight: int = IMAGE_REFRESH_MAX_IN_FLIGHT,
+    ) -> None:
+        self.hass = hass
+        self.cameras_api = cameras_api
+        self.interval = interval
+        self._entities: dict[str, "UcamsCameraImageEntity"] = {}
+        self._cancel: dict[str, CALLBACK_TYPE] = {}
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    def _jitter(self) -> float:
+        spread = self.interval * IMAGE_REFRESH_JITTER
+        return random.uniform(-spread, spread)
+
+    def _phase(self, camera_id: str) -> float:
+        return self.interval * (zlib.crc32(str(camera_id).encode()) / 0xFFFFFFFF)
+
+    @callback
+    def async_add(self, entity: "UcamsCameraImageEntity") -> None:
+        self._entities[entity.camera_id] = entity
+        self._schedule(entity.camera_id, max(self._phase(entity.camera_id) + self._jitter(), 0))
+
+    @callback
+    def async_remove(self, camera_id: str) -> None:
+        self._entities.pop(camera_id, None)
+        cancel = self._cancel.pop(camera_id, None)
+        if cancel:
+            cancel()
+
+    def _schedule(self, camera_id: str, delay: float) -> None:
+        cancel = self._cancel.pop(camera_id, None)
+        if cancel:
+            cancel()
+
+        async def _refresh(_now) -> None:
+            self._cancel.pop(camera_id, None)
+            await self.async_refresh(camera_id)
+
+        self._cancel[camera_id] = async_call_later(self.hass, delay, _refresh)
+
+    def pending(self, camera_id: str) -> bool:
+        return camera_id in self._cancel
+
+    async def async_refresh(self, camera_id: str) -> None:
+        entity = self._entities.get(camera_id)
+        if entity is None:
+            return
+        try:
+            async with self._semaphore:
+                # Прогреваем кэш снимков, entity.async_image затем отдаст его без загрузки
+                await self.cameras_api.get_camera_image(camera_id)
+            entity.async_mark_image_updated()
+        except Exception as e:
+            _LOGGER.warning("Failed to refresh image for camera %s: %s", camera_id, e)
+        if camera_id in self._entities:
+            self._schedule(camera_id, max(self.interval + self._jitter(), 1))
+
+
 class UcamsCameraImageEntity(ImageEntity):
     def __init__(
         self,
@@ -28,40 +108,37 @@ class UcamsCameraImageEntity(ImageEntity):
         config_entry: ConfigEntry,
         cameras_api: UcamsApi,
         camera_info: dict,
+        scheduler: ImageRefreshScheduler,
     ) -> None:
         super().__init__(hass)
 
         self.hass = hass
         self.config_entry_id = config_entry.entry_id
         self.cameras_api = cameras_api
+        self.scheduler = scheduler
         self.camera_id = camera_info["id"]
         self.device_name = self.cameras_api.build_device_name(camera_info["title"])
-        device_slug = re.sub(r"[^a-z0-9]+", "_", self.device_name.lower()).strip("_")
-        camera_slug = re.sub(r"[^a-z0-9]+", "_", str(self.camera_id).lower()).strip("_")
-        object_id = f"{device_slug}_{camera_slug}" if camera_slug else device_slug
-        self.entity_id = f"image.{object_id}"
+        self.entity_id = f"image.{cameras_api.build_object_id(camera_info['title'], self.camera_id)}"
         self.camera_image_refresh_interval = config_entry.options[
             CONF_CAMERA_IMAGE_REFRESH_INTERVAL
         ]
         self._attr_unique_id = f"image-{self.camera_id}"
         self._attr_name = self.device_name
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.scheduler.async_add(self)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self.scheduler.async_remove(self.camera_id)
+
     async def async_image(self) -> bytes | None:
-        res = await self.cameras_api.get_camera_image(self.camera_id)
-        self.camera_image_task = asyncio.create_task(
-            self.set_image_last_updated(self.camera_image_refresh_interval)
-        )
-        return res
-
-    async def set_image_last_updated(self, ttl: int) -> None:
-        await asyncio.sleep(ttl)
-        self._attr_image_last_updated = datetime.now()
-        await self.hass.services.async_call(
-            "homeassistant",
-            "update_entity",
-            {"entity_id": self.entity_id},
-            blocking=False,
-        )
+        return await self.cameras_api.get_camera_image(self.camera_id)
+
+    @callback
+    def async_mark_image_updated(self) -> None:
+        self._attr_image_last_updated = dt_util.utcnow()
+        self.async_write_ha_state()
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -0,0 +1,124 @@
+import asyncio
+import re
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+
+from aiohttp import ClientError
+from yarl import URL
+
+# Верхние границы корзин гистограммы задержек, мс; последняя корзина - всё, что дольше
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_ID_SEGMENT = re.compile(r"\d")
+_VERSION_SEGMENT = re.compile(r"v\d+")
+
+
+def endpoint_name(method: str, url) -> str:
+    """``METHOD /path`` with id-like segments collapsed, so every camera shares one endpoint."""
+    path = URL(str(url)).path
+    segments = [
+        "{id}" if _ID_SEGMENT.search(segment) and not _VERSION_SEGMENT.fullmatch(segment) else segment
+        for segment in path.split("/")
+    ]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    unauthorized: int = 0
+    latency_sum_ms: float = 0.0
+    latency_max_ms: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def record(self, status: int | None, elapsed_ms: float) -> None:
+        self.requests += 1
+        if status is None or status >= 400:
+            self.errors += 1
+        if status == 401:
+            self.unauthorized += 1
+        self.latency_sum_ms += elapsed_ms
+        self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile_ms(self, percentile: float) -> float | None:
+        """Upper bound of the bucket holding the percentile; None if there were no requests."""
+        if not self.requests:
+            return None
+        rank = percentile / 100 * self.requests
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.latency_max_ms
+        return self.latency_max_ms
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "unauthorized": self.unauthorized,
+            "latency_avg_ms": round(self.latency_sum_ms / self.requests, 1) if self.requests else None,
+            "latency_p50_ms": self.percentile_ms(50),
+            "latency_p95_ms": self.percentile_ms(95),
+            "latency_max_ms": round(self.latency_max_ms, 1),
+            "latency_buckets_ms": {
+                **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class RequestMetrics:
+    """Per-endpoint request counters and latency histograms of one API client."""
+
+    def __init__(self):
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def record(self, endpoint: str, status: int | None, elapsed: float) -> None:
+        """Record one request; ``status`` None means the request failed before a response."""
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.record(status, elapsed * 1000)
+
+    @property
+    def requests(self) -> int:
+        return sum(stats.requests for stats in self.endpoints.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(stats.errors for stats in self.endpoints.values())
+
+    @property
+    def unauthorized(self) -> int:
+        return sum(stats.unauthorized for stats in self.endpoints.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "unauthorized": self.unauthorized,
+            "endpoints": {name: stats.as_dict() for name, stats in sorted(self.endpoints.items())},
+        }
+
+
+@asynccontextmanager
+async def instrumented_request(session, metrics: RequestMetrics, method: str, url, *, endpoint: str | None = None,
+                               **kwargs):
+    """``session.request`` that records status and time to response headers in ``metrics``."""
+    endpoint = endpoint or endpoint_name(method, url)
+    started = monotonic()
+    recorded = False
+    try:
+        async with session.request(method, url, **kwargs) as resp:
+            metrics.record(endpoint, resp.status, monotonic() - started)
+            recorded = True
+            yield resp
+    except (ClientError, asyncio.TimeoutError):
+        if not recorded:
+            metrics.record(endpoint, None, monotonic() - started)
+        raise
@@ -0,0 +1,94 @@
+from custom_components.ucams.utils import SCREEN, VIDEO, WS_VIDEO
+
+_URL_KEYS = {f"url_{url_type}": url_type for url_type in (VIDEO, WS_VIDEO, SCREEN)}
+
+
+class CameraRecord:
+    """Camera of the account.
+
+    ``token_l`` is stored once; the video and screenshot URLs that embed it are
+    built on first access and dropped when the token rotates. Item access
+    (``record["title"]``, ``record.get("url_screen")``) is kept for code that
+    treats camera info as a dict.
+    """
+
+    __slots__ = ("id", "title", "domain", "screenshot_domain", "token_l", "token_exp", "_urls")
+
+    def __init__(self, id: str, title: str, domain: str, screenshot_domain: str):
+        self.id = id
+        self.title = title
+        self.domain = domain
+        self.screenshot_domain = screenshot_domain
+        self.token_l: str | None = None
+        self.token_exp = 0
+        self._urls: dict[str, str] | None = None
+
+    def update(self, title: str, domain: str, screenshot_domain: str) -> None:
+        """Apply a fresh cameras/my/ record; cached URLs survive unless a server changed."""
+        self.title = title
+        if (domain, screenshot_domain) != (self.domain, self.screenshot_domain):
+            self.domain = domain
+            self.screenshot_domain = screenshot_domain
+            self._urls = None
+
+    def set_token(self, token_l: str, token_exp: int) -> bool:
+        """Store a new token_l. Returns True if it replaced a different token."""
+        rotated = self.token_l is not None and self.token_l != token_l
+        if token_l != self.token_l:
+            self._urls = None
+        self.token_l = token_l
+        self.token_exp = token_exp
+        return rotated
+
+    def url(self, url_type: str) -> str | None:
+        if self.token_l is None:
+            return None
+        if self._urls is None:
+            self._urls = {}
+        url = self._urls.get(url_type)
+        if url is None:
+            url = self._build_url(url_type)
+            if url is not None:
+                self._urls[url_type] = url
+        return url
+
+    def _build_url(self, url_type: str) -> str | None:
+        token_l = self.token_l
+        if url_type == VIDEO:
+            return f"rtsp://{self.domain}/{self.id}?token={token_l}&tracks=v1a1"
+        # Домены приходят без пути, поэтому urljoin не нужен: тот же результат без разбора URL
+        if url_type == WS_VIDEO:
+            return f"wss://{self.domain}/{self.id}/mse_ld?tracks=a1v1&realtime=true&token={token_l}"
+        if url_type == SCREEN:
+            return f"https://{self.screenshot_domain}/api/v0/screenshots/{self.id}~600.jpg?token={token_l}"
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "domain": self.domain,
+            "screenshot_domain": self.screenshot_domain,
+            "token_l": self.token_l,
+            "token_exp": self.token_exp,
+        }
+
+    def __getitem__(self, key: str):
+        if key in _URL_KEYS:
+            return self.url(_URL_KEYS[key])
+        if key in self.__slots__ and not key.startswith("_"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return key in _URL_KEYS or (key in self.__slots__ and not key.startswith("_"))
+
+    def __repr__(self) -> str:
+        return f"CameraRecord(id={self.id!r}, title={self.title!r}, token_exp={self.token_exp})"
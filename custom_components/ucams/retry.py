@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from time import monotonic, time
+
+from aiohttp import ClientError
+from yarl import URL
+
+from custom_components.ucams.utils import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# 429 и ошибки шлюза/сервера, после которых запрос имеет смысл повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ClientError):
+    """The host failed too often recently; the request was not sent."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit for {host} is open, retry in {retry_in:.0f} s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive 5xx/transport failures of one host.
+
+    While open, requests fail fast for ``reset_timeout`` seconds; then one trial
+    request is let through and its result closes or re-opens the circuit.
+    """
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    def check(self) -> None:
+        if self.state == CLOSED:
+            return
+        retry_in = self._opened_at + self.reset_timeout - monotonic()
+        if self.state == OPEN and retry_in <= 0:
+            self.state = HALF_OPEN
+        # Пробный запрос, не вернувший результата (например, отменённый), не блокирует хост навсегда
+        if self.state == HALF_OPEN and (
+                not self._trial_in_flight or monotonic() - self._trial_started > self.reset_timeout
+        ):
+            self._trial_in_flight = True
+            self._trial_started = monotonic()
+            return
+        raise CircuitOpenError(self.host, max(retry_in, 0))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            _LOGGER.info("Circuit for %s closed", self.host)
+        self.state = CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                _LOGGER.warning("Circuit for %s opened after %s failures", self.host, self.failures)
+                self.opened += 1
+            self.state = OPEN
+            self._opened_at = monotonic()
+
+    def record_status(self, status: int) -> None:
+        if status >= 500:
+            self.record_failure()
+        elif status != 429:
+            self.record_success()
+        else:
+            # Ограничение частоты не считается отказом хоста
+            self._trial_in_flight = False
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "retry_in": round(max(self._opened_at + self.reset_timeout - monotonic(), 0), 1)
+            if self.state == OPEN else 0,
+        }
+
+
+class RequestPolicy:
+    """Bounded retries with jittered exponential backoff and a circuit breaker per host."""
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.retries = 0
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def is_open(self, url) -> bool:
+        breaker = self.breakers.get(URL(str(url)).host)
+        return breaker is not None and breaker.state == OPEN
+
+    def backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Delay before the next attempt: Retry-After if the server sent it, otherwise full jitter."""
+        delay = _parse_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return min(delay, self.max_delay)
+
+    def as_dict(self) -> dict:
+        return {
+            "max_attempts": self.max_attempts,
+            "retries": self.retries,
+            "breakers": {host: breaker.as_dict() for host, breaker in sorted(self.breakers.items())},
+        }
+
+    @asynccontextmanager
+    async def request(self, send, url, *, on_unauthorized=None, retry_errors: bool = True):
+        """Send a request through ``send()`` (a factory of response context managers).
+
+        401 is retried once ``on_unauthorized`` renewed the token; 429 always and
+        5xx/transport errors if ``retry_errors`` - for requests that must not be
+        repeated once the server might have processed them, pass False.
+        The last response is yielded as is, so callers keep their status handling.
+        """
+        breaker = self.breaker(URL(str(url)).host)
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.check()
+            last_attempt = attempt >= self.max_attempts
+            yielded = False
+            retry_auth = False
+            delay = None
+            try:
+                async with send() as resp:
+                    status = resp.status
+                    if status == 401 and on_unauthorized and not last_attempt:
+                        breaker.record_status(status)
+                        retry_auth = True
+                    elif status in RETRY_STATUSES and not last_attempt and (retry_errors or status == 429):
+                        breaker.record_status(status)
+                        delay = self.backoff(attempt, resp.headers.get("Retry-After"))
+                    else:
+                        breaker.record_status(status)
+                        yielded = True
+                        yield resp
+                        return
+            except (ClientError, asyncio.TimeoutError) as e:
+                if yielded or isinstance(e, CircuitOpenError):
+                    raise
+                breaker.record_failure()
+                if last_attempt or not retry_errors:
+                    raise
+                delay = self.backoff(attempt)
+                _LOGGER.debug("Request to %s failed (%s), retry %s in %.1f s", url, e, attempt, delay)
+            self.retries += 1
+            if retry_auth:
+                await on_unauthorized()
+            else:
+                await asyncio.sleep(delay)
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time(), 0)
+    except (TypeError, ValueError):
+        return None
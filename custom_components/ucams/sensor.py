@@ -1,30 +1,52 @@
 import logging
-from datetime import datetime
+from abc import abstractmethod
+from datetime import datetime, timedelta
 
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
 
-from .utils import DOMAIN
+from .utils import (
+    CONF_CONTRACTS_UPDATE_INTERVAL,
+    DEFAULT_CONTRACTS_UPDATE_INTERVAL,
+    DOMAIN,
+    MIN_CONTRACTS_UPDATE_INTERVAL,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+REQUEST_METRICS = ("requests", "errors", "unauthorized", "token_refreshes")
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     dom_api = hass.data[config_entry.entry_id]["dom_api"]
-    contracts = await dom_api.get_all_contracts()
+    coordinator = ContractsCoordinator(
+        hass,
+        dom_api,
+        max(
+            config_entry.options.get(CONF_CONTRACTS_UPDATE_INTERVAL, DEFAULT_CONTRACTS_UPDATE_INTERVAL),
+            MIN_CONTRACTS_UPDATE_INTERVAL,
+        ),
+    )
+    hass.data[config_entry.entry_id]["contracts_coordinator"] = coordinator
+    # Договоры из хранилища: сенсоры создаются сразу, а облако опрашивается уже в фоне
+    restored = coordinator.async_restore()
+    if not restored:
+        await coordinator.async_refresh()
 
     sensors = []
-    if contracts["status"] != "ok":
-        return
-    for contract in contracts["detail"]["contracts"]:
-        contract_id = contract["contract_id"]
-        billing_id = contract["billing_id"]
-        details = await dom_api.get_contract_details(contract_id, billing_id)
-
-        for detail in details["detail"]:
-            sensors.append(ContractDetailSensor(hass, detail))
-            for service in detail["services"]:
-                sensors.append(ServiceDetailSensor(hass, contract, service))
+    if coordinator.last_update_success:
+        for contract_id, contract in coordinator.data["contracts"].items():
+            for detail in coordinator.data["details"].get(contract_id, []):
+                sensors.append(ContractDetailSensor(coordinator, detail))
+                for service in detail["services"]:
+                    sensors.append(ServiceDetailSensor(coordinator, contract, service))
 
     cameras_api = hass.data[config_entry.entry_id]["cameras_api"]
     cameras_info = hass.data[config_entry.entry_id]["cameras_info"]
@@ -42,17 +64,113 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
         hass.data[config_entry.entry_id].setdefault("archive_link_sensors", {})[camera_id] = archive_sensor
 
+    for api_name, api in (("ucams", cameras_api), ("dom", dom_api)):
+        for kind in REQUEST_METRICS:
+            sensors.append(RequestMetricsSensor(config_entry.entry_id, api_name, api, kind))
+
     async_add_entities(sensors)
 
+    store = hass.data[config_entry.entry_id]["store"]
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(lambda: store.async_schedule_save(cameras_api, dom_api))
+    )
+    if restored:
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} contracts {config_entry.entry_id}"
+        )
+
+
+class ContractsCoordinator(DataUpdateCoordinator):
+    """Polls contracts and their details for all contract and service sensors."""
+
+    def __init__(self, hass, dom_api, update_interval: int):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} contracts",
+            update_interval=timedelta(seconds=update_interval),
+        )
+        self.dom_api = dom_api
+
+    async def _async_update_data(self) -> dict:
+        try:
+            contracts = await self.dom_api.get_all_contracts()
+        except Exception as e:
+            raise UpdateFailed(f"Failed to load contracts: {e}") from e
+        if contracts.get("status") != "ok":
+            raise UpdateFailed(f"Contracts status: {contracts.get('status')}")
+        contract_list = contracts["detail"]["contracts"]
+        details = await self.dom_api.get_contracts_details(contract_list)
+        # В хранилище ключи стали бы строками, поэтому сохраняем плоские списки
+        self.dom_api.contracts = {
+            "contracts": contract_list,
+            "details": [detail for group in details.values() for detail in group],
+        }
+        return {
+            "contracts": {contract["contract_id"]: contract for contract in contract_list},
+            "details": details,
+        }
+
+    @callback
+    def async_restore(self) -> bool:
+        """Use the contracts persisted by the previous run. Returns False if there are none."""
+        stored = self.dom_api.contracts
+        if not stored:
+            return False
+        details = {}
+        for detail in stored["details"]:
+            details.setdefault(detail["contract_id"], []).append(detail)
+        self.async_set_updated_data({
+            "contracts": {contract["contract_id"]: contract for contract in stored["contracts"]},
+            "details": details,
+        })
+        return True
+
+
+class ChangeOnlyCoordinatorEntity(CoordinatorEntity):
+    """Writes state only when availability, value or attributes actually changed."""
 
-class ContractDetailSensor(SensorEntity):
-    def __init__(self, hass, detail):
-        self.hass = hass
+    _last_written = None
+
+    @abstractmethod
+    def _refresh_from_coordinator(self) -> None:
+        """Take this entity's data from the fresh coordinator result."""
+
+    def _state_signature(self):
+        return self.available, self.native_value, self.extra_state_attributes
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Данные могли обновиться в фоне между созданием сенсора и его добавлением
+        if self.coordinator.last_update_success:
+            self._refresh_from_coordinator()
+        self._last_written = self._state_signature()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if self.coordinator.last_update_success:
+            self._refresh_from_coordinator()
+        signature = self._state_signature()
+        if signature == self._last_written:
+            return
+        self._last_written = signature
+        self.async_write_ha_state()
+
+
+class ContractDetailSensor(ChangeOnlyCoordinatorEntity, SensorEntity):
+    def __init__(self, coordinator, detail):
+        super().__init__(coordinator)
         self.detail = detail
         self._attr_name = f"Договор {detail['contract_title']}"
         self._attr_unique_id = f"contract_{detail['contract_id']}"
         self._attr_native_value = detail["balance"]["current"]
 
+    def _refresh_from_coordinator(self) -> None:
+        for detail in self.coordinator.data["details"].get(self.detail["contract_id"], []):
+            self.detail = detail
+            self._attr_native_value = detail["balance"]["current"]
+            break
+
     @property
     def extra_state_attributes(self):
         detail = self.detail
@@ -91,15 +209,25 @@ class ContractDetailSensor(SensorEntity):
         }
 
 
-class ServiceDetailSensor(SensorEntity):
-    def __init__(self, hass, contract, service):
-        self.hass = hass
+class ServiceDetailSensor(ChangeOnlyCoordinatorEntity, SensorEntity):
+    def __init__(self, coordinator, contract, service):
+        super().__init__(coordinator)
         self.contract = contract
         self.service = service
         self._attr_name = f"Услуга {service['service_title_name']}"
         self._attr_unique_id = f"service_{contract['contract_id']}_{service['service_id']}"
         self._attr_native_value = service["service_status"]
 
+    def _refresh_from_coordinator(self) -> None:
+        contract_id = self.contract["contract_id"]
+        self.contract = self.coordinator.data["contracts"].get(contract_id, self.contract)
+        for detail in self.coordinator.data["details"].get(contract_id, []):
+            for service in detail["services"]:
+                if service["service_id"] == self.service["service_id"]:
+                    self.service = service
+                    self._attr_native_value = service["service_status"]
+                    return
+
     @property
     def extra_state_attributes(self):
         tariff = self.service.get("tariff", {})
@@ -150,6 +278,14 @@ class ArchiveLinkSensor(SensorEntity):
             self._attrs["comment"] = "Archive generated"
         self.async_write_ha_state()
 
+    def update_download(self, status: str, downloaded: int = 0, total: int = 0, path: str = None):
+        self._attrs["download_status"] = status
+        self._attrs["download_bytes"] = downloaded
+        self._attrs["download_progress"] = round(downloaded * 100 / total, 1) if total else None
+        if path:
+            self._attrs["download_path"] = path
+        self.async_write_ha_state()
+
     async def async_update(self):
         pass
 
@@ -159,4 +295,47 @@ class ArchiveLinkSensor(SensorEntity):
             "identifiers": {(DOMAIN, f"{self._config_entry_id}_{self._camera_id}")},
             "name": self._device_name,
             "manufacturer": "Ufanet",
-        }
\ No newline at end of file
+        }
+
+class RequestMetricsSensor(SensorEntity):
+    """Request counters of one API client; disabled by default, enable for troubleshooting."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, config_entry_id: str, api_name: str, api, kind: str):
+        self._config_entry_id = config_entry_id
+        self._api = api
+        self._kind = kind
+        self._attr_name = f"{api_name} {kind.replace('_', ' ')}"
+        self._attr_unique_id = f"{config_entry_id}_{api_name}_{kind}"
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = {}
+
+    async def async_update(self):
+        metrics = self._api.metrics
+        if self._kind == "token_refreshes":
+            self._attr_native_value = self._api.token_refresh_count
+            return
+        self._attr_native_value = getattr(metrics, self._kind)
+        if self._kind == "requests":
+            self._attr_extra_state_attributes = {
+                name: {
+                    key: value for key, value in stats.as_dict().items() if key != "latency_buckets_ms"
+                }
+                for name, stats in metrics.endpoints.items()
+            }
+        else:
+            self._attr_extra_state_attributes = {
+                name: getattr(stats, self._kind)
+                for name, stats in metrics.endpoints.items()
+                if getattr(stats, self._kind)
+            }
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return {
+            "identifiers": {(DOMAIN, f"{self._config_entry_id}_diagnostics")},
+            "name": "Ucams diagnostics",
+            "manufacturer": "Ufanet",
+        }
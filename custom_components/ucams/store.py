@@ -0,0 +1,49 @@
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from custom_components.ucams.utils import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+
+class EntryStore:
+    """Last known camera inventory, SKUD list and tokens of one config entry.
+
+    Lets the entry create its entities on start without waiting for the cloud;
+    the data lives in ``.storage/ucams.<entry_id>``.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}", private=True, atomic_writes=True)
+
+    async def async_restore(self, cameras_api, dom_api) -> bool:
+        """Load stored state into the APIs. Returns False if there is no usable inventory."""
+        try:
+            data = await self._store.async_load()
+        except Exception as e:
+            _LOGGER.warning("Stored ucams state is unreadable, loading from the cloud: %s", e)
+            return False
+        if not data or not data.get("cameras", {}).get("cameras"):
+            return False
+        dom_api.restore_state(data.get("dom", {}))
+        cameras_api.restore_state(data["cameras"])
+        return True
+
+    @callback
+    def async_schedule_save(self, cameras_api, dom_api) -> None:
+        self._store.async_delay_save(lambda: self._data(cameras_api, dom_api), STORAGE_SAVE_DELAY)
+
+    async def async_save(self, cameras_api, dom_api) -> None:
+        await self._store.async_save(self._data(cameras_api, dom_api))
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+    @staticmethod
+    def _data(cameras_api, dom_api) -> dict:
+        return {"cameras": cameras_api.stored_state(), "dom": dom_api.stored_state()}
@@ -1,6 +1,5 @@
 import asyncio
 import logging
-import re
 from typing import Any
 
 from homeassistant.components.switch import SwitchEntity
@@ -16,8 +15,11 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     dom_api = hass.data[config_entry.entry_id]["dom_api"]
     cameras_api = hass.data[config_entry.entry_id]["cameras_api"]
-    skud_list = await dom_api.get_shared_skud()
-    entities = []
+    # При старте из сохранённого состояния список уже есть, фоновая сверка обновит его
+    skud_list = dom_api.shared_skud
+    if skud_list is None:
+        skud_list = await dom_api.get_shared_skud()
+    skud_cameras = []
     for skud_info in skud_list:
         camera_id = skud_info.get("cctv_number")
         _LOGGER.debug(f"SKUD: {skud_info}")
@@ -25,14 +27,25 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         camera_info = (
             await cameras_api.get_camera_info(camera_id) if camera_id else None
         )
-        entities.append(
-            DomUfanetSwitchEntity(
-                hass, config_entry, cameras_api, dom_api, skud_info, camera_info
-            )
+        skud_cameras.append((skud_info, camera_info))
+    await cameras_api.async_prepare_device_names(
+        skud_device_title(skud_info, camera_info) for skud_info, camera_info in skud_cameras
+    )
+    entities = [
+        DomUfanetSwitchEntity(
+            hass, config_entry, cameras_api, dom_api, skud_info, camera_info
         )
+        for skud_info, camera_info in skud_cameras
+    ]
     async_add_entities(entities)
 
 
+def skud_device_title(skud_info: dict, camera_info: dict | None) -> str:
+    if camera_info:
+        return camera_info["title"]
+    return skud_info["string_view"] + "_" + str(skud_info["id"])
+
+
 class DomUfanetSwitchEntity(SwitchEntity):
     def __init__(
         self,
@@ -51,16 +64,9 @@ class DomUfanetSwitchEntity(SwitchEntity):
         self.dom_api = dom_api
         self.skud_id = skud_info["id"]
         self.camera_id = skud_info.get("cctv_number")  # may be None
-        if camera_info:
-            self.device_name = self.cameras_api.build_device_name(camera_info["title"])
-        else:
-            self.device_name = self.cameras_api.build_device_name(
-                skud_info["string_view"] + "_" + str(self.skud_id)
-            )
-        device_slug = re.sub(r"[^a-z0-9]+", "_", self.device_name.lower()).strip("_")
-        skud_slug = re.sub(r"[^a-z0-9]+", "_", str(self.skud_id).lower()).strip("_")
-        object_id = f"{device_slug}_{skud_slug}" if skud_slug else device_slug
-        self.entity_id = f"switch.{object_id}"
+        device_title = skud_device_title(skud_info, camera_info)
+        self.device_name = self.cameras_api.build_device_name(device_title)
+        self.entity_id = f"switch.{self.cameras_api.build_object_id(device_title, self.skud_id)}"
         self._attr_unique_id = f"switch-{self.skud_id}"
         self._attr_name = self.device_name
         self._attr_is_on = False
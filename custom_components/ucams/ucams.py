@@ -1,22 +1,47 @@
+import asyncio
+import heapq
 import logging
+from contextlib import asynccontextmanager
 from pprint import pformat
 from time import time
 from urllib.parse import urljoin
 
-from aiohttp import ClientSession
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
-from transliterate import translit
+from homeassistant.helpers.event import async_call_later
 
+from custom_components.ucams.client import create_session
+from custom_components.ucams.cache import ArchiveUrlCache, ScreenshotCache
+from custom_components.ucams.metrics import RequestMetrics, instrumented_request
+from custom_components.ucams.records import CameraRecord
+from custom_components.ucams.retry import CircuitOpenError, RequestPolicy
 from custom_components.ucams.utils import (
     CONF_NAME,
     CONF_CAMERA_IMAGE_REFRESH_INTERVAL,
+    CONF_CAMERAS_CACHE_TTL,
+    CONF_CAMERAS_PAGE_SIZE,
+    CONF_CAMERAS_CONCURRENT_PAGES,
+    DEFAULT_CAMERAS_CACHE_TTL,
+    DEFAULT_CAMERAS_PAGE_SIZE,
+    MAX_CAMERAS_PAGE_SIZE,
+    DEFAULT_CAMERAS_CONCURRENT_PAGES,
     TOKEN_REFRESH_BUFFER,
+    TOKEN_RENEWAL_MARGIN,
+    CAMERA_TOKEN_BATCH_SIZE,
+    CAMERA_TOKEN_RENEWAL_WINDOW,
+    ARCHIVE_CACHE_MAX_ENTRIES,
+    ARCHIVE_TOKEN_TTL,
+    SCREENSHOT_CACHE_TTL,
+    SCREENSHOT_CACHE_MAX_BYTES,
     VIDEO,
     WS_VIDEO,
     SCREEN,
-    decode_token, )
+    SingleFlight,
+    async_transliterate_many,
+    decode_token,
+    slugify,
+    transliterate, )
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,11 +59,33 @@ class UcamsApi:
         self._ufanet_api = ufanet_api
         self.config_entry_name = config_entry.data[CONF_NAME]
         self.cameras = {}
+        self.cameras_updated_at = 0
+        self.inventory = CameraInventory(
+            self, config_entry.options.get(CONF_CAMERAS_CACHE_TTL, DEFAULT_CAMERAS_CACHE_TTL)
+        )
         self.camera_image_refresh_interval = config_entry.options[CONF_CAMERA_IMAGE_REFRESH_INTERVAL]
+        self.cameras_page_size = min(
+            max(config_entry.options.get(CONF_CAMERAS_PAGE_SIZE, DEFAULT_CAMERAS_PAGE_SIZE), 1), MAX_CAMERAS_PAGE_SIZE
+        )
+        self.cameras_concurrent_pages = max(
+            config_entry.options.get(CONF_CAMERAS_CONCURRENT_PAGES, DEFAULT_CAMERAS_CONCURRENT_PAGES), 1
+        )
         self.cams_server = None
         self.token = None
         self.token_expiration = 0
-        self.session = ClientSession(headers=HEADERS)
+        self.token_refresh_count = 0
+        self.session = create_session(HEADERS)
+        self.metrics = RequestMetrics()
+        self.policy = RequestPolicy()
+        self._auth_flight = SingleFlight()
+        self._token_flight = SingleFlight()
+        self._cancel_token_renewal = None
+        self._token_index = []  # min-heap (token_exp, camera_id), устаревшие записи пропускаются лениво
+        self._cancel_camera_token_renewal = None
+        self._token_listeners: dict[str, list] = {}
+        self.screenshots = ScreenshotCache(SCREENSHOT_CACHE_MAX_BYTES)
+        self.archive_urls = ArchiveUrlCache(ARCHIVE_CACHE_MAX_ENTRIES)
+        self._screenshot_flight = SingleFlight()
 
     async def _authenticate(self):
         cams_servers = set()
@@ -55,33 +102,125 @@ class UcamsApi:
             _LOGGER.warning("Multiple cams servers found: %s", cams_servers)
         self.cams_server = next(iter(cams_servers), self.cams_server)
         url = urljoin(self.cams_server, "api/v0/auth/?ttl=20800")
-        self.session.headers["Authorization"] = self._ufanet_api.session.headers.get(
-                "Authorization"
-            )
-        async with self.session.post(url) as resp:
+        dom_headers = await self._ufanet_api.get_auth_headers()
+        dom_token = self._ufanet_api.token
+
+        async def renew_dom_token():
+            nonlocal dom_headers, dom_token
+            await self._ufanet_api.renew_rejected_token(dom_token)
+            dom_headers = await self._ufanet_api.get_auth_headers()
+            dom_token = self._ufanet_api.token
+
+        async with self.policy.request(
+                lambda: instrumented_request(self.session, self.metrics, "POST", url, headers=dom_headers), url,
+                on_unauthorized=renew_dom_token,
+        ) as resp:
             resp.raise_for_status()
             data = await resp.json()
             _LOGGER.debug(pformat(data))
             self.token = data["token"]
             self.token_expiration = decode_token(self.token).get("exp", 0)
-            self.session.headers["Authorization"] = f"Bearer {self.token}"
+        self.token_refresh_count += 1
+        self._schedule_token_renewal()
+
+    async def _refresh_token(self):
+        """Authenticate once for all concurrent callers."""
+        await self._auth_flight.run("auth", self._authenticate)
+
+    async def renew_rejected_token(self, rejected: str | None):
+        """A request with ``rejected`` got 401; renew it unless a concurrent request already did."""
+        if self.token == rejected:
+            await self._refresh_token()
+
+    def _schedule_token_renewal(self):
+        """Schedule background renewal shortly before the request path would need it."""
+        if self._cancel_token_renewal:
+            self._cancel_token_renewal()
+            self._cancel_token_renewal = None
+        delay = self.token_expiration - TOKEN_REFRESH_BUFFER - TOKEN_RENEWAL_MARGIN - int(time())
+        if delay <= 0:
+            return
+        self._cancel_token_renewal = async_call_later(self.hass, delay, self._async_renew_token)
+
+    async def _async_renew_token(self, _now):
+        self._cancel_token_renewal = None
+        try:
+            await self._refresh_token()
+        except Exception as e:
+            _LOGGER.warning("Background token renewal failed: %s", e)
 
     async def get_authenticated_session(self):
         now = int(time())
         _LOGGER.debug(f"Token expiration: {self.token_expiration}. Now: {now}")
-        if (
-                not self.token
-                or now >= self.token_expiration - TOKEN_REFRESH_BUFFER
-                or self._ufanet_api.token_expiration < now
-        ):
-            await self._authenticate()
+        # Срок dom-токена здесь не важен: _authenticate сам берёт свежие заголовки dom
+        if not self.token or now >= self.token_expiration - TOKEN_REFRESH_BUFFER:
+            await self._refresh_token()
         return self.session
 
-    async def get_cameras_info(self) -> dict:
+    def _auth_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    @asynccontextmanager
+    async def _request(self, method: str, url, *, headers: dict | None = None, **kwargs):
+        """Send a request with a valid token in its own Authorization header.
+
+        Relative URLs are resolved against the cams server known after authentication.
+        """
         session = await self.get_authenticated_session()
-        page = 1
-        page_size = 60
+        url = urljoin(self.cams_server, url)
+
+        sent_token = None
 
+        def send():
+            # Заголовок собирается на каждую попытку: после 401 токен уже новый
+            nonlocal sent_token
+            sent_token = self.token
+            return instrumented_request(
+                session, self.metrics, method, url, headers={**self._auth_headers(), **(headers or {})}, **kwargs
+            )
+
+        async with self.policy.request(
+                send, url, on_unauthorized=lambda: self.renew_rejected_token(sent_token)
+        ) as resp:
+            yield resp
+
+    def stored_state(self) -> dict:
+        """Camera inventory and tokens kept between restarts."""
+        return {
+            "cams_server": self.cams_server,
+            "token": self.token,
+            "token_expiration": self.token_expiration,
+            "cameras_updated_at": self.cameras_updated_at,
+            "cameras": [camera.as_dict() for camera in self.cameras.values()],
+        }
+
+    def restore_state(self, state: dict) -> None:
+        """Load the stored inventory; expired camera tokens are renewed on first use or by the scheduler."""
+        self.cams_server = state.get("cams_server") or self.cams_server
+        if state.get("token") and state.get("token_expiration", 0) - TOKEN_REFRESH_BUFFER > int(time()):
+            self.token = state["token"]
+            self.token_expiration = state["token_expiration"]
+            self._schedule_token_renewal()
+        for stored in state.get("cameras", []):
+            camera_info = self.cameras[stored["id"]] = CameraRecord(
+                stored["id"], stored["title"], stored["domain"], stored["screenshot_domain"]
+            )
+            if stored.get("token_l"):
+                self._set_camera_token(camera_info, stored["token_l"])
+        self.cameras_updated_at = state.get("cameras_updated_at", 0)
+        self._compact_token_index()
+        self._schedule_camera_token_renewal()
+
+    async def close(self):
+        if self._cancel_token_renewal:
+            self._cancel_token_renewal()
+            self._cancel_token_renewal = None
+        if self._cancel_camera_token_renewal:
+            self._cancel_camera_token_renewal()
+            self._cancel_camera_token_renewal = None
+        await self.session.close()
+
+    async def get_cameras_info(self) -> dict:
         json_data = {
             "order_by": "addr_asc",
             "fields": [
@@ -102,63 +241,193 @@ class UcamsApi:
                 "record_disable_period",
             ],
             "token_l_ttl": 86400,
-            "page": page,
-            "page_size": page_size,
+            "page_size": self.cameras_page_size,
         }
-        url = urljoin(self.cams_server, "api/v0/cameras/my/")
-
-        cameras_info = {"results": []}
-        while True:
-            async with session.post(url, json=json_data) as resp:
-                status_code = resp.status
-                if status_code == 401:
-                    _LOGGER.error("Authentication failed. Trying to re-authenticate")
-                    await self._authenticate()
-                    return await self.get_cameras_info()
-                resp.raise_for_status()
-                response_data = await resp.json()
-                cameras_info["results"].extend(response_data.get("results", []))
-                if len(response_data.get("results", [])) < page_size:
-                    break
-                page += 1
-                json_data["page"] = page
+        url = "api/v0/cameras/my/"
+
+        pages = await self._fetch_camera_pages(url, json_data)
+
+        # Объединяем по номеру камеры: при сдвиге списка между страницами дубликаты схлопываются
+        merged = {}
+        for results in pages:
+            for cam in results:
+                merged.setdefault(cam["number"], cam)
+        cameras_info = {"results": list(merged.values())}
+        # Камеры, удалённые из аккаунта (в том числе восстановленные из хранилища), убираем
+        for camera_id in set(self.cameras) - set(merged):
+            del self.cameras[camera_id]
 
         for cam in cameras_info["results"]:
-            cam_id = cam["number"]
-            token_l = cam["token_l"]
-            domain = cam["server"]["domain"]
-            screenshot_domain = cam["server"]["screenshot_domain"]
-            title = cam["title"]
-
-            rtsp_link = f"rtsp://{domain}/{cam_id}?token={token_l}&tracks=v1a1"
-            ws_video = urljoin(
-                f"wss://{domain}", f"{cam_id}/mse_ld?tracks=a1v1&realtime=true&token={token_l}"
-            )
-            url_screen = urljoin(
-                f"https://{screenshot_domain}", f"api/v0/screenshots/{cam_id}~600.jpg?token={token_l}"
+            # Существующие записи обновляются на месте, URL пересобираются только при смене token_l
+            camera_info = self.cameras.get(cam["number"])
+            if camera_info is None:
+                camera_info = self.cameras[cam["number"]] = CameraRecord(
+                    cam["number"], cam["title"], cam["server"]["domain"], cam["server"]["screenshot_domain"]
+                )
+            else:
+                camera_info.update(cam["title"], cam["server"]["domain"], cam["server"]["screenshot_domain"])
+            self._set_camera_token(camera_info, cam["token_l"])
+
+        self.cameras_updated_at = time()
+        self._compact_token_index()
+        self._schedule_camera_token_renewal()
+        return self.cameras
+
+    async def _fetch_camera_page(self, url: str, json_data: dict, page: int) -> tuple[list[dict], int | None]:
+        """Fetch one cameras/my/ page and the total ``count`` if the server sent it.
+
+        A rejected token is renewed and retried by the request policy.
+        """
+        async with self._request("POST", url, json={**json_data, "page": page}) as resp:
+            resp.raise_for_status()
+            response_data = await resp.json()
+            return response_data.get("results", []), response_data.get("count")
+
+    async def _fetch_camera_pages(self, url: str, json_data: dict) -> list[list[dict]]:
+        """Fetch cameras/my/ pages in order.
+
+        After the first page, up to ``cameras_concurrent_pages`` following pages are
+        requested in parallel. Fetching stops once ``count`` cameras arrived, at an
+        empty page or at a page shorter than the server's actual page size: if the
+        server caps the page below ``cameras_page_size``, the first page is shorter
+        than requested although ``count`` says there is more.
+        """
+        first, count = await self._fetch_camera_page(url, json_data, 1)
+        pages = [first]
+        page_size = self.cameras_page_size
+        if count is not None and first and len(first) < min(page_size, count):
+            _LOGGER.debug("Server returns %s cameras per page instead of %s", len(first), page_size)
+            page_size = len(first)
+        fetched = len(first)
+
+        def last_page(results: list[dict]) -> bool:
+            return not results or len(results) < page_size or (count is not None and fetched >= count)
+
+        page = 1
+        while not last_page(pages[-1]):
+            batch = range(page + 1, page + 1 + self.cameras_concurrent_pages)
+            results = await asyncio.gather(
+                *(self._fetch_camera_page(url, json_data, p) for p in batch)
             )
+            for result, _ in results:
+                pages.append(result)
+                fetched += len(result)
+                if last_page(result):
+                    break
+            page = batch[-1]
+        return pages
+
+    def _set_camera_token(self, camera_info: CameraRecord, token_l: str):
+        """Store token_l and index its expiry; URLs that embed it are rebuilt lazily."""
+        if token_l == camera_info.token_l:
+            return
+        rotated = camera_info.set_token(token_l, self._decode_token_exp(token_l) or 0)
+        heapq.heappush(self._token_index, (camera_info.token_exp, camera_info.id))
+        if rotated:
+            for listener in list(self._token_listeners.get(camera_info.id, [])):
+                listener()
+
+    @callback
+    def async_add_token_listener(self, camera_id: str, listener) -> CALLBACK_TYPE:
+        """Call ``listener`` whenever token_l of the camera rotates. Returns an unsubscribe callback."""
+        listeners = self._token_listeners.setdefault(camera_id, [])
+        listeners.append(listener)
+
+        @callback
+        def _remove():
+            listeners.remove(listener)
+
+        return _remove
+
+    async def refresh_camera_tokens(self, camera_ids: list[str]):
+        """Renew token_l only for the given cameras with one cameras/this/ request."""
+        json_data = {
+            "fields": [
+                "number",
+                "token_l",
+            ],
+            "token_l_ttl": 86400,
+            "numbers": list(camera_ids),
+        }
+        async with self._request(
+                "POST", "api/v0/cameras/this/", params={"lang": "ru"}, json=json_data
+        ) as response:
+            response.raise_for_status()
+            response_data = await response.json()
 
-            self.cameras[cam_id] = {
-                "id": cam_id,
-                "title": title,
-                "domain": domain,
-                "url_video": rtsp_link,
-                "url_ws_video": ws_video,
-                "url_screen": url_screen,
-                "token_l": token_l,
-            }
+        for item in response_data.get("results", []):
+            camera_info = self.cameras.get(item.get("number"))
+            if camera_info and item.get("token_l"):
+                self._set_camera_token(camera_info, item["token_l"])
+
+    async def _renew_expiring_tokens(self, horizon: int):
+        """Renew, in batches, token_l of every camera that expires before ``horizon``."""
+        expiring = sorted({
+            camera_id
+            for token_exp, camera_id in self._token_index
+            if token_exp < horizon and self._is_indexed(token_exp, camera_id)
+        })
+        for i in range(0, len(expiring), CAMERA_TOKEN_BATCH_SIZE):
+            await self.refresh_camera_tokens(expiring[i:i + CAMERA_TOKEN_BATCH_SIZE])
+
+    def _is_indexed(self, token_exp: int, camera_id: str) -> bool:
+        camera_info = self.cameras.get(camera_id)
+        return camera_info is not None and camera_info.token_exp == token_exp
+
+    def _compact_token_index(self):
+        self._token_index = [
+            (camera_info.token_exp, camera_id)
+            for camera_id, camera_info in self.cameras.items()
+            if camera_info.token_l
+        ]
+        heapq.heapify(self._token_index)
+
+    def _schedule_camera_token_renewal(self, min_delay: int = 0):
+        """Schedule one timer for the earliest camera token that needs renewal."""
+        if self._cancel_camera_token_renewal:
+            self._cancel_camera_token_renewal()
+            self._cancel_camera_token_renewal = None
+        while self._token_index and not self._is_indexed(*self._token_index[0]):
+            heapq.heappop(self._token_index)
+        if not self._token_index:
+            return
+        token_exp = self._token_index[0][0]
+        delay = max(token_exp - TOKEN_REFRESH_BUFFER - int(time()), min_delay)
+        self._cancel_camera_token_renewal = async_call_later(
+            self.hass, delay, self._async_renew_camera_tokens
+        )
+
+    async def _async_renew_camera_tokens(self, _now):
+        self._cancel_camera_token_renewal = None
+        # Захватываем и токены, истекающие чуть позже, чтобы обновить их тем же запросом
+        horizon = int(time()) + TOKEN_REFRESH_BUFFER + CAMERA_TOKEN_RENEWAL_WINDOW
+        try:
+            await self._token_flight.run("token_l", lambda: self._renew_expiring_tokens(horizon))
+        except Exception as e:
+            _LOGGER.warning("Background camera token renewal failed: %s", e)
+        if len(self._token_index) > 2 * len(self.cameras):
+            self._compact_token_index()
+        self._schedule_camera_token_renewal(min_delay=TOKEN_RENEWAL_MARGIN)
 
-        return self.cameras
+    def _device_name_source(self, device_title) -> str:
+        return f"{self.config_entry_name}.{device_title.lower()}"
 
     def build_device_name(self, device_title) -> str:
-        device_name = device_title.lower()
-        device_name = f"{self.config_entry_name}.{device_name}"
-        device_name = translit(device_name, "ru", reversed=True)
-        return device_name.capitalize()
+        return transliterate(self._device_name_source(device_title)).capitalize()
+
+    def build_object_id(self, device_title, suffix) -> str:
+        """Object id of an entity: device name slug plus the slug of its camera/skud id."""
+        device_slug = slugify(self.build_device_name(device_title))
+        suffix_slug = slugify(str(suffix))
+        return f"{device_slug}_{suffix_slug}" if suffix_slug else device_slug
 
-    async def get_camera_info(self, camera_id: str) -> dict | None:
+    async def async_prepare_device_names(self, device_titles):
+        """Transliterate titles off the event loop so entity constructors only hit the cache."""
+        await async_transliterate_many({self._device_name_source(title) for title in device_titles})
+
+    async def get_camera_info(self, camera_id: str) -> CameraRecord | None:
         if camera_id not in self.cameras:
-            await self.get_cameras_info()
+            await self.inventory.async_get()
         return self.cameras.get(camera_id)
 
     async def get_camera_url(self, camera_id: str, url_type: str) -> str | None:
@@ -173,22 +442,23 @@ class UcamsApi:
 
         now = int(time())
 
-        # Проверяем срок действия `token_l`
-        token_exp = self._decode_token_exp(camera_info.get("token_l"))
+        # Срок действия `token_l` декодируется при загрузке камеры, обновление выполняет планировщик.
+        # Сюда попадаем, только если фоновое обновление не успело или не удалось.
+        token_exp = camera_info.token_exp
         if token_exp and (token_exp - now) < TOKEN_REFRESH_BUFFER:
-            _LOGGER.warning(f"Camera token {camera_id} is about to expire ({token_exp - now} sec), refreshing cameras list.")
-            await self.get_cameras_info()  # Обновляем информацию о камерах
-            camera_info = await self.get_camera_info(camera_id)  # Повторно загружаем камеру
+            _LOGGER.warning(f"Camera token {camera_id} is about to expire ({token_exp - now} sec), refreshing camera tokens.")
+            # Один пакетный запрос на все истекающие камеры, параллельные вызовы к нему присоединяются
+            horizon = now + TOKEN_REFRESH_BUFFER
+            await self._token_flight.run("token_l", lambda: self._renew_expiring_tokens(horizon))
 
         # Проверяем, обновился ли `token_l`
-        token_exp = self._decode_token_exp(camera_info.get("token_l"))
+        token_exp = camera_info.token_exp
         if not token_exp or (token_exp - now) < TOKEN_REFRESH_BUFFER:
             _LOGGER.error(f"Failed to update token for camera {camera_id}.")
             return None
 
         # Получаем URL нужного типа
-        url_key = f"url_{url_type}"
-        url = camera_info.get(url_key)
+        url = camera_info.url(url_type)
 
         if not url:
             _LOGGER.error(f"URL ({url_type}) not found for camera {camera_id}.")
@@ -202,7 +472,7 @@ class UcamsApi:
         try:
             decoded = decode_token(token)
             return int(decoded.get("exp", 0))
-        except Exception as e:
+        except (ValueError, TypeError, AttributeError) as e:
             _LOGGER.error(f"Token decoding error: {e}")
             return None
 
@@ -214,21 +484,94 @@ class UcamsApi:
         result = await self.get_camera_url(camera_id, VIDEO)
         return result
 
-    async def get_camera_image(self, camera_id: str) -> str | None:
-        session = await self.get_authenticated_session()
+    async def get_camera_image(self, camera_id: str) -> bytes | None:
+        cached = self.screenshots.get(camera_id)
+        if cached and cached.is_fresh(SCREENSHOT_CACHE_TTL):
+            return cached.content
+        # Одновременные запросы одной камеры ждут одну загрузку
+        return await self._screenshot_flight.run(camera_id, lambda: self._fetch_camera_image(camera_id))
+
+    async def _fetch_camera_image(self, camera_id: str) -> bytes | None:
         result = await self.get_camera_url(camera_id, SCREEN)
-        if result:
-            async with session.get(result) as resp:
+        if not result:
+            return None
+        cached = self.screenshots.get(camera_id)
+        headers = cached.validators() if cached else {}
+        try:
+            async with self._request("GET", result, headers=headers) as resp:
+                if resp.status == 304 and cached:
+                    self.screenshots.touch(camera_id)
+                    return cached.content
                 resp.raise_for_status()
                 content = await resp.read()
+                self.screenshots.put(
+                    camera_id, content, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+                )
                 return content
+        except CircuitOpenError:
+            # Сервер скриншотов недоступен: отдаём последний кадр, пока цепь не закроется
+            if cached:
+                return cached.content
+            raise
 
     async def get_camera_archive(self, camera_id: str, start_time: int, delta_time: int):
         """Get archive"""
-        session = await self.get_authenticated_session()
-        camera_info = await self.get_camera_info(camera_id)
-        _LOGGER.debug(camera_info)
-        domain = camera_info.get("domain")
+        archive_urls = await self.get_cameras_archive([(camera_id, start_time, delta_time)])
+        return archive_urls.get((camera_id, start_time, delta_time))
+
+    async def get_cameras_archive(self, windows: list[tuple[str, int, int]]) -> dict[tuple[str, int, int], str | None]:
+        """Get archive links for many ``(camera_id, start_time, duration)`` windows.
+
+        token_d start and duration are request-wide, so cameras sharing a window are
+        resolved with one cameras/this/ request; distinct windows run concurrently.
+        """
+        archive_urls = {}
+        by_window: dict[tuple[int, int], list[str]] = {}
+        for camera_id, start_time, delta_time in windows:
+            cached = self.archive_urls.get((camera_id, start_time, delta_time))
+            if cached:
+                archive_urls[(camera_id, start_time, delta_time)] = cached
+                continue
+            numbers = by_window.setdefault((start_time, delta_time), [])
+            if camera_id not in numbers:
+                numbers.append(camera_id)
+        for camera_id in {camera_id for numbers in by_window.values() for camera_id in numbers}:
+            await self.get_camera_info(camera_id)
+
+        async def _resolve(window, numbers):
+            tokens = {}
+            for i in range(0, len(numbers), CAMERA_TOKEN_BATCH_SIZE):
+                tokens.update(await self._fetch_archive_tokens(numbers[i:i + CAMERA_TOKEN_BATCH_SIZE], *window))
+            return window, tokens
+
+        resolved = dict(await asyncio.gather(
+            *(_resolve(window, numbers) for window, numbers in by_window.items())
+        ))
+
+        for camera_id, start_time, delta_time in windows:
+            if (camera_id, start_time, delta_time) in archive_urls:
+                continue
+            token_d = resolved[(start_time, delta_time)].get(camera_id)
+            camera_info = self.cameras.get(camera_id)
+            if not token_d or not camera_info:
+                archive_urls[(camera_id, start_time, delta_time)] = None
+                continue
+            file_extension = '.mp4' if delta_time <= 3600 else '.ts'
+            archive_url = f'https://{camera_info.domain}/{camera_id}/archive-{start_time}-{delta_time}{file_extension}?token={token_d}'
+            _LOGGER.debug(archive_url)
+            archive_urls[(camera_id, start_time, delta_time)] = archive_url
+            self.archive_urls.put(
+                (camera_id, start_time, delta_time), archive_url, self._archive_token_expiry(token_d)
+            )
+        return archive_urls
+
+    def _archive_token_expiry(self, token_d: str) -> float:
+        """Moment after which a cached archive link should no longer be handed out."""
+        token_exp = self._decode_token_exp(token_d) or int(time()) + ARCHIVE_TOKEN_TTL
+        return token_exp - TOKEN_REFRESH_BUFFER
+
+    async def _fetch_archive_tokens(self, numbers: list[str], start_time: int, delta_time: int) -> dict[str, str]:
+        """Request token_d for several cameras and one archive window."""
         params = {
             'lang': 'ru',
         }
@@ -237,35 +580,52 @@ class UcamsApi:
             'fields': [
                 'token_d',
             ],
-            'token_d_ttl': 3600,
+            'token_d_ttl': ARCHIVE_TOKEN_TTL,
             'token_d_duration': delta_time,
             'token_d_start': start_time,
-            'numbers': [
-                camera_id,
-            ],
+            'numbers': numbers,
         }
         _LOGGER.debug(json_data)
 
-        async with session.post(f'{self.cams_server}/api/v0/cameras/this/', params=params, json=json_data) as response:
-            status_code = response.status
-            if status_code == 401:
-                _LOGGER.error("Authentication failed. Trying to re-authenticate")
-
-                await self._authenticate()
-                return await self.get_camera_archive(camera_id, start_time, delta_time)
+        async with self._request("POST", 'api/v0/cameras/this/', params=params, json=json_data) as response:
             response.raise_for_status()
             response_data = await response.json()
             _LOGGER.debug(f"Archive response: {response_data}")
-            result = response_data.get('results', [])
-            if not result:
-                return None
-            for item in result:
-                if item['number'] == camera_id:
-                    params = {
-                        'token': item['token_d'],
-                    }
-
-                    file_extension = '.mp4' if delta_time <= 3600 else '.ts'
-                    archive_url = f'https://{domain}/{item.get("number")}/archive-{start_time}-{delta_time}{file_extension}?token={item["token_d"]}'
-                    _LOGGER.debug(archive_url)
-                    return archive_url
+            return {
+                item['number']: item['token_d']
+                for item in response_data.get('results', [])
+                if item.get('token_d')
+            }
+
+
+class CameraInventory:
+    """Camera list shared by all platforms of a config entry.
+
+    Platforms read ``cameras`` without network I/O; ``async_get`` reloads the
+    list only when it is older than ``ttl`` and joins a reload already in flight.
+    """
+
+    def __init__(self, api: UcamsApi, ttl: int):
+        self._api = api
+        self.ttl = ttl
+        self._flight = SingleFlight()
+
+    @property
+    def cameras(self) -> dict:
+        return self._api.cameras
+
+    @property
+    def is_fresh(self) -> bool:
+        updated_at = self._api.cameras_updated_at
+        return bool(updated_at) and time() - updated_at < self.ttl
+
+    async def async_get(self, force: bool = False) -> dict:
+        if force or not self.is_fresh:
+            try:
+                await self._flight.run("cameras", self._api.get_cameras_info)
+            except CircuitOpenError as e:
+                # Облако недоступно: работаем с последним известным списком
+                if not self.cameras:
+                    raise
+                _LOGGER.debug("Serving cached camera list: %s", e)
+        return self.cameras
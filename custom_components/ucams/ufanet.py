@@ -1,16 +1,25 @@
 import asyncio
 import logging
+from contextlib import asynccontextmanager
+from time import time
 from urllib.parse import urljoin
 
 import aiohttp
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 
+from custom_components.ucams.client import create_session
+from custom_components.ucams.metrics import RequestMetrics, instrumented_request
+from custom_components.ucams.retry import RequestPolicy
 from custom_components.ucams.utils import (
     CONF_DOM_URL,
     CONF_USERNAME,
     CONF_PASSWORD, TOKEN_REFRESH_BUFFER,
+    CONTRACT_DETAILS_MAX_PARALLEL,
+    SingleFlight,
+    decode_token,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -29,67 +38,227 @@ class DomApi:
         self.username = config_entry.options[CONF_USERNAME]
         self.password = config_entry.options[CONF_PASSWORD]
         self.base_url = config_entry.options[CONF_DOM_URL]
-        self.session = aiohttp.ClientSession(headers=HEADERS, trust_env=True)
+        self.session = create_session(HEADERS, trust_env=True)
+        self.metrics = RequestMetrics()
+        self.policy = RequestPolicy()
         self.token = None
         self.token_expiration = 0
+        self.refresh_token = None
+        self.refresh_token_expiration = 0
+        self.token_refresh_count = 0
+        # Сбрасывается, если сервер не знает эндпоинт refresh: дальше сразу логинимся
+        self.refresh_supported = True
+        self.shared_skud: list[dict] | None = None
+        # Последние договоры с деталями, {"contracts": [...], "details": [...]}; их заполняет ContractsCoordinator
+        self.contracts: dict | None = None
+        self._auth_flight = SingleFlight()
+
+    def _store_token(self, token: dict):
+        """Store access/refresh tokens and their epoch expiry."""
+        self.token = token["access"]
+        self.token_expiration = token.get("exp") or _token_exp(self.token)
+        # Если refresh не пришёл, оставляем предыдущий
+        refresh = token.get("refresh")
+        if refresh:
+            self.refresh_token = refresh
+            self.refresh_token_expiration = _token_exp(refresh)
+        self.token_refresh_count += 1
 
     async def _authenticate(self):
         url = urljoin(self.base_url, "api/v1/auth/auth_by_contract/")
         payload = {"contract": self.username, "password": self.password}
-        async with self.session.post(url, json=payload, compress=False) as resp:
+        async with self.policy.request(
+                lambda: instrumented_request(self.session, self.metrics, "POST", url, json=payload, compress=False), url
+        ) as resp:
             if resp.status != 200:
                 response_text = await resp.text()
                 _LOGGER.error("Authentication failed: %s", response_text)
                 raise ConfigEntryNotReady(f"Authentication failed: {response_text}")
             data = await resp.json()
-            token = data["token"]
-            access = token["access"]
-            self.token_expiration = token.get("exp", 0)
-            self.session.headers.update({"Authorization": f"JWT {access}"})
+            self._store_token(data["token"])
 
-    async def get_authenticated_session(self):
-        now = asyncio.get_running_loop().time()
-        if not self.token or now >= self.token_expiration - TOKEN_REFRESH_BUFFER:
+    async def _refresh(self) -> bool:
+        """Renew the access token with the refresh token. Returns False if it is not possible."""
+        now = int(time())
+        if not self.refresh_supported or not self.refresh_token or (
+                self.refresh_token_expiration and now >= self.refresh_token_expiration - TOKEN_REFRESH_BUFFER
+        ):
+            return False
+        url = urljoin(self.base_url, "api/v1/auth/refresh/")
+        payload = {"refresh": self.refresh_token}
+        try:
+            async with self.policy.request(
+                    lambda: instrumented_request(self.session, self.metrics, "POST", url, json=payload, compress=False),
+                    url,
+            ) as resp:
+                if resp.status in (404, 405):
+                    _LOGGER.info("Token refresh is not supported by %s, using authentication", self.base_url)
+                    self.refresh_supported = False
+                    return False
+                if resp.status != 200:
+                    _LOGGER.debug("Token refresh failed with status %s", resp.status)
+                    self.refresh_token = None
+                    return False
+                data = await resp.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _LOGGER.debug("Token refresh failed: %s", e)
+            return False
+        token = data.get("token", data)
+        if "access" not in token:
+            self.refresh_token = None
+            return False
+        self._store_token(token)
+        return True
+
+    async def _renew_token(self):
+        if not await self._refresh():
             await self._authenticate()
+
+    def _token_valid(self) -> bool:
+        return bool(self.token) and int(time()) < self.token_expiration - TOKEN_REFRESH_BUFFER
+
+    async def get_authenticated_session(self):
+        if not self._token_valid():
+            await self._auth_flight.run("auth", self._renew_token)
         return self.session
 
-    async def get_shared_skud(self):
+    def _auth_headers(self) -> dict:
+        return {"Authorization": f"JWT {self.token}"}
+
+    async def get_auth_headers(self) -> dict:
+        """Authorization headers with a valid access token."""
+        await self.get_authenticated_session()
+        return self._auth_headers()
+
+    async def renew_rejected_token(self, rejected: str | None):
+        """The server rejected a token that looked valid locally (revoked); get a new one.
+
+        Requests that were in flight with the same token get 401 too, only the
+        first of them renews it; the rest retry with the already renewed token.
+        """
+        if self.token == rejected:
+            self.token_expiration = 0
+        await self.get_authenticated_session()
+
+    @asynccontextmanager
+    async def _request(self, method: str, url: str, *, retry_errors: bool = True, **kwargs):
+        """Send a request with a valid token in its own Authorization header."""
         session = await self.get_authenticated_session()
+
+        sent_token = None
+
+        def send():
+            nonlocal sent_token
+            sent_token = self.token
+            return instrumented_request(session, self.metrics, method, url, headers=self._auth_headers(), **kwargs)
+
+        async with self.policy.request(
+                send, url, on_unauthorized=lambda: self.renew_rejected_token(sent_token), retry_errors=retry_errors
+        ) as resp:
+            yield resp
+
+    async def get_shared_skud(self):
         url = urljoin(self.base_url, "api/v0/skud/shared/")
-        async with session.get(url) as resp:
+        async with self._request("GET", url) as resp:
             resp.raise_for_status()
-            return await resp.json()
+            self.shared_skud = await resp.json()
+            return self.shared_skud
 
     async def open_skud(self, skud_id):
-        session = await self.get_authenticated_session()
         url = urljoin(self.base_url, f"api/v0/skud/shared/{skud_id}/open/")
-        async with session.get(url) as resp:
+        # Дверь не открываем повторно, если сервер мог уже выполнить команду
+        async with self._request("GET", url, retry_errors=False) as resp:
             resp.raise_for_status()
             return await resp.json()
 
     async def get_contract_info(self):
-        session = await self.get_authenticated_session()
         url = urljoin(self.base_url, "api/v0/contract/")
-        async with session.get(url) as resp:
+        async with self._request("GET", url) as resp:
             resp.raise_for_status()
             return await resp.json()
 
     async def get_all_contracts(self):
         """Получение всех контрактов."""
-        session = await self.get_authenticated_session()
         url = urljoin(self.base_url, "api/v0/contract_info/get_all_contract/")
-        async with session.get(url) as resp:
+        async with self._request("GET", url) as resp:
             resp.raise_for_status()
             return await resp.json()
 
     async def get_contract_details(self, contract_id, billing_id):
         """Получение детальной информации о контракте."""
-        session = await self.get_authenticated_session()
         url = urljoin(self.base_url, "api/v0/contract_info/get_contract_info/")
         payload = {"contracts": [{"contract_id": contract_id, "billing_id": billing_id}]}
-        async with session.post(url, json=payload) as resp:
+        async with self._request("POST", url, json=payload) as resp:
             resp.raise_for_status()
             return await resp.json()
 
+    async def get_contracts_details(self, contracts: list[dict]) -> dict:
+        """Детальная информация по нескольким контрактам: {contract_id: [detail, ...]}.
+
+        Сначала пробуем один пакетный запрос; если он не удался, запрашиваем
+        контракты параллельно (с ограничением), ошибка одного не мешает остальным.
+        """
+        url = urljoin(self.base_url, "api/v0/contract_info/get_contract_info/")
+        payload = {"contracts": [
+            {"contract_id": contract["contract_id"], "billing_id": contract["billing_id"]}
+            for contract in contracts
+        ]}
+        try:
+            async with self._request("POST", url, json=payload) as resp:
+                resp.raise_for_status()
+                details = await resp.json()
+            return _group_details(details.get("detail", []))
+        except Exception as e:
+            _LOGGER.warning("Batched contract details request failed, loading one by one: %s", e)
+
+        semaphore = asyncio.Semaphore(CONTRACT_DETAILS_MAX_PARALLEL)
+
+        async def _load(contract):
+            async with semaphore:
+                try:
+                    return (await self.get_contract_details(contract["contract_id"], contract["billing_id"]))["detail"]
+                except Exception as err:
+                    _LOGGER.error("Failed to load details of contract %s: %s", contract["contract_id"], err)
+                    return []
+
+        results = await asyncio.gather(*(_load(contract) for contract in contracts))
+        return _group_details([detail for details in results for detail in details])
+
+    def stored_state(self) -> dict:
+        """Tokens, SKUD list and contracts kept between restarts."""
+        return {
+            "token": self.token,
+            "token_expiration": self.token_expiration,
+            "refresh_token": self.refresh_token,
+            "refresh_token_expiration": self.refresh_token_expiration,
+            "shared_skud": self.shared_skud,
+            "contracts": self.contracts,
+        }
+
+    def restore_state(self, state: dict) -> None:
+        now = int(time())
+        if state.get("token") and state.get("token_expiration", 0) - TOKEN_REFRESH_BUFFER > now:
+            self.token = state["token"]
+            self.token_expiration = state["token_expiration"]
+        if state.get("refresh_token") and state.get("refresh_token_expiration", 0) > now:
+            self.refresh_token = state["refresh_token"]
+            self.refresh_token_expiration = state["refresh_token_expiration"]
+        self.shared_skud = state.get("shared_skud")
+        self.contracts = state.get("contracts")
+
     async def close(self):
         await self.session.close()
+
+
+def _group_details(details: list[dict]) -> dict:
+    grouped = {}
+    for detail in details:
+        grouped.setdefault(detail["contract_id"], []).append(detail)
+    return grouped
+
+
+def _token_exp(token: str) -> int:
+    try:
+        return int(decode_token(token).get("exp", 0))
+    except (ValueError, TypeError, AttributeError):
+        return 0
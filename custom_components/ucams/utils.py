@@ -2,6 +2,9 @@ import base64
 import json
 import functools
 import asyncio
+import re
+from collections import OrderedDict
+from time import time
 from transliterate import translit
 
 import jwt
@@ -12,23 +15,178 @@ CONF_DOM_URL = "dom_link"
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_CAMERA_IMAGE_REFRESH_INTERVAL = "camera_image_refresh_interval"
+CONF_CAMERAS_CACHE_TTL = "cameras_cache_ttl"
+DEFAULT_CAMERAS_CACHE_TTL = 3600
+CONF_CAMERAS_PAGE_SIZE = "cameras_page_size"
+DEFAULT_CAMERAS_PAGE_SIZE = 60
+# Больше этого cameras/my/ за страницу не отдаёт; меньший предел сервера определяется по count
+MAX_CAMERAS_PAGE_SIZE = 100
+CONF_CAMERAS_CONCURRENT_PAGES = "cameras_concurrent_pages"
+DEFAULT_CAMERAS_CONCURRENT_PAGES = 1
+CONF_FFMPEG_MAX_PROCESSES = "ffmpeg_max_processes"
+DEFAULT_FFMPEG_MAX_PROCESSES = 2
+CONF_HOT_CAMERAS = "hot_cameras"
+CONF_CONTRACTS_UPDATE_INTERVAL = "contracts_update_interval"
+DEFAULT_CONTRACTS_UPDATE_INTERVAL = 3600
+MIN_CONTRACTS_UPDATE_INTERVAL = 60
 DOMAIN = "ucams"
 TOKEN_REFRESH_BUFFER = 300
+NAME_CACHE_SIZE = 4096
+TOKEN_CLAIMS_CACHE_SIZE = 2048
+TOKEN_RENEWAL_MARGIN = 60
+CAMERA_TOKEN_RENEWAL_WINDOW = 600
+CAMERA_TOKEN_BATCH_SIZE = 100
+ARCHIVE_TOKEN_TTL = 3600
+ARCHIVE_CACHE_MAX_ENTRIES = 512
+ARCHIVE_WINDOW_BUCKET = 60
+ARCHIVE_SEGMENT_DURATION = 3600
+ARCHIVE_MAX_PARALLEL_SEGMENTS = 3
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+SCREENSHOT_CACHE_TTL = 30
+SCREENSHOT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+IMAGE_REFRESH_JITTER = 0.05
+IMAGE_REFRESH_MAX_IN_FLIGHT = 4
+SNAPSHOT_TIMEOUT = 15
+SNAPSHOT_MAX_PARALLEL = 4
+KEYFRAME_BUFFER_SIZE = 3
+KEYFRAME_MAX_AGE = 30
 TIMEOUT = 30
+HTTP_LIMIT = 100
+HTTP_LIMIT_PER_HOST = 8
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 60
+CONTRACT_DETAILS_MAX_PARALLEL = 4
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
 VIDEO = "video"
 WS_VIDEO = "ws_video"
 SCREEN = "screen"
 
 
-def decode_token(token):
+def parse_hot_cameras(value: str | None) -> set[str]:
+    """Parse the comma separated list of camera numbers kept warm by the keyframe grabber."""
+    return {number.strip() for number in (value or "").split(",") if number.strip()}
+
+
+class TokenClaimsCache:
+    """LRU кэш декодированных claims, ключ - строка токена.
+
+    Запись удаляется, как только истекает exp токена; токены без exp живут до вытеснения.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[dict, float | None]] = OrderedDict()
+
+    def get(self, token: str) -> dict | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at is not None and expires_at <= time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        expires_at = exp if isinstance(exp, (int, float)) else None
+        if expires_at is not None and expires_at <= time():
+            return
+        self._entries[token] = (claims, expires_at)
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.max_entries:
+            self._evict_expired()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_expired(self) -> None:
+        now = time()
+        for token in [t for t, (_, exp) in self._entries.items() if exp is not None and exp <= now]:
+            del self._entries[token]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_token_claims = TokenClaimsCache(TOKEN_CLAIMS_CACHE_SIZE)
+
+
+def _decode_token_claims(token: str) -> dict:
     try:
         return jwt.decode(token, options={"verify_signature": False})
-    except:
+    except jwt.InvalidTokenError:
+        # Не JWT: первый сегмент - base64 от JSON. Ошибки разбора (ValueError) уходят вызывающему
         return json.loads(base64.b64decode(token.split(".")[0]).decode())
 
 
-async def async_transliterate(text) -> str:
-    """Асинхронный вариант translit()"""
+def decode_token(token: str) -> dict:
+    claims = _token_claims.get(token)
+    if claims is None:
+        claims = _decode_token_claims(token)
+        _token_claims.put(token, claims)
+    # Копия, чтобы вызывающий код не испортил закэшированные claims
+    return dict(claims)
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def transliterate(text: str) -> str:
+    """Кэшируемый translit() из русского в латиницу"""
+    return translit(text, "ru", reversed=True)
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def slugify(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+
+def _transliterate_all(texts: list[str]) -> list[str]:
+    return [transliterate(text) for text in texts]
+
+
+_TRANSLITERATE_LOCK = asyncio.Lock()
+
+
+async def async_transliterate_many(texts) -> list[str]:
+    """translit() для набора строк одной задачей в executor.
+
+    Языковой пакет transliterate загружается лениво и не потокобезопасно,
+    поэтому параллельные первые вызовы из нескольких потоков падают: задачи
+    платформ выполняются по очереди, а сущности создаются только после них.
+    """
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, functools.partial(translit, text, "ru", reversed=True))
+    async with _TRANSLITERATE_LOCK:
+        return await loop.run_in_executor(None, _transliterate_all, list(texts))
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом в одну задачу."""
+
+    def __init__(self):
+        self._tasks: dict = {}
+
+    def in_flight(self, key) -> bool:
+        return key in self._tasks
+
+    async def run(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(functools.partial(self._done, key))
+        # shield: отмена одного из ожидающих не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
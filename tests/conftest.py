@@ -32,7 +32,12 @@ def config_entry():
         title="Ucams",
         data={"name": "Test Config"},
         source="user",
-        options={"camera_image_refresh_interval": 10},
+        options={
+            "camera_image_refresh_interval": 10,
+            "dom_link": "https://dom.example.com",
+            "username": "123456",
+            "password": "secret",
+        },
         entry_id="1",
     )
 
@@ -41,9 +46,12 @@ def config_entry():
 def mock_ufanet_api():
     class MockUfanetApi:
         def __init__(self):
-            self.session = SimpleNamespace(headers={})
+            self.token = "dom_token"
             self.token_expiration = 0
 
+        async def get_auth_headers(self):
+            return {"Authorization": "JWT dom_token"}
+
         async def get_contract_info(self):
             return [{"isp_org": {"cams_server": {"url": "https://cams.example.com"}}}]
 
@@ -54,5 +62,15 @@ def mock_ufanet_api():
 async def ucams_api(hass, config_entry, mock_ufanet_api):
     from custom_components.ucams.ucams import UcamsApi
     api = UcamsApi(hass, config_entry, mock_ufanet_api)
+    api.policy.base_delay = 0
+    yield api
+    await api.close()
+
+
+@pytest.fixture
+async def dom_api(hass, config_entry):
+    from custom_components.ucams.ufanet import DomApi
+    api = DomApi(hass, config_entry)
+    api.policy.base_delay = 0
     yield api
-    await api.session.close()
+    await api.close()
@@ -0,0 +1,310 @@
+""" Local emulator of dom.ufanet.ru and the cams server for end-to-end tests
+
+Every host name resolves to one local TLS server, so the URLs built by the
+integration (https dom/cams/screenshot hosts) reach the emulator unchanged.
+Latency, 401/429/5xx responses, token expiry and pagination are configurable.
+"""
+import asyncio
+import datetime
+import random
+import socket
+import ssl
+import tempfile
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import jwt
+from aiohttp import ClientSession, TCPConnector, web
+from aiohttp.abc import AbstractResolver
+
+SECRET = "emulator"
+DOM_URL = "https://dom.example.com/"
+CAMS_URL = "https://cams.example.com/"
+SCREENSHOT_DOMAIN = "screen.example.com"
+TOKEN_KINDS = ("access", "refresh", "cams", "token_l", "token_d")
+JPEG = b"\xff\xd8" + b"\0" * 1024 + b"\xff\xd9"
+
+
+@dataclass
+class LoadProfile:
+    """How slow and how flaky the emulated backend is."""
+
+    latency: float = 0.0  # секунды на каждый ответ
+    jitter: float = 0.0  # случайная добавка 0..jitter секунд
+    route_latency: dict[str, float] = field(default_factory=dict)  # добавка для отдельных маршрутов
+    error_rate: float = 0.0  # вероятность ответа 503
+    throttle_rate: float = 0.0  # вероятность ответа 429
+    retry_after: int = 1
+    seed: int | None = None
+
+
+class _EmulatorResolver(AbstractResolver):
+    def __init__(self, port: int):
+        self.port = port
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET):
+        return [{
+            "hostname": host,
+            "host": "127.0.0.1",
+            "port": self.port,
+            "family": socket.AF_INET,
+            "proto": 0,
+            "flags": socket.AI_NUMERICHOST,
+        }]
+
+    async def close(self) -> None:
+        pass
+
+
+def _server_ssl_context(directory: str) -> ssl.SSLContext:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "emulator")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = Path(directory, "cert.pem"), Path(directory, "key.pem")
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class UfanetEmulator:
+    """aiohttp application serving the dom and cams endpoints used by the integration.
+
+    ``requests`` counts handled requests per route name, ``inject`` queues
+    responses with given statuses for a route and ``expire_tokens`` revokes the
+    tokens issued so far, so the next request carrying one of them gets 401.
+    """
+
+    def __init__(
+        self,
+        cameras: int = 10,
+        skuds: int = 2,
+        contract: str = "123456",
+        password: str = "secret",
+        profile: LoadProfile | None = None,
+        token_ttl: int = 20800,
+        token_l_ttl: int = 86400,
+    ):
+        self.contract = contract
+        self.password = password
+        self.profile = profile or LoadProfile()
+        self.token_ttl = token_ttl
+        self.token_l_ttl = token_l_ttl
+        self.cameras = [
+            {
+                "number": f"{1700000000 + i}",
+                "title": f"Камера {i}",
+                "server": {"domain": f"flussonic{i % 4}.example.com", "screenshot_domain": SCREENSHOT_DOMAIN},
+            }
+            for i in range(cameras)
+        ]
+        self.skuds = [
+            {
+                "id": i,
+                "string_view": f"Домофон {i}",
+                "timeout": 5,
+                "cctv_number": self.cameras[i]["number"] if i < cameras else None,
+            }
+            for i in range(skuds)
+        ]
+        self.requests: Counter[str] = Counter()
+        self._faults: dict[str, deque[int]] = {}
+        self._generations = Counter()
+        self._random = random.Random(self.profile.seed)
+        self._runner: web.AppRunner | None = None
+        self._tmp = tempfile.TemporaryDirectory()
+        self.port: int | None = None
+
+    # -- управление -------------------------------------------------------
+
+    def inject(self, route: str, *statuses: int) -> None:
+        """Answer the next requests of ``route`` with ``statuses``, in order."""
+        self._faults.setdefault(route, deque()).extend(statuses)
+
+    def expire_tokens(self, *kinds: str) -> None:
+        """Revoke tokens issued so far: all of them, or only ``kinds`` (access, refresh, cams, token_l, token_d)."""
+        for kind in kinds or TOKEN_KINDS:
+            self._generations[kind] += 1
+
+    async def start(self) -> None:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/api/v1/auth/auth_by_contract/", self._auth_by_contract, name="auth_by_contract")
+        app.router.add_post("/api/v1/auth/refresh/", self._refresh, name="refresh")
+        app.router.add_get("/api/v0/contract/", self._contract, name="contract")
+        app.router.add_get("/api/v0/skud/shared/", self._skud_shared, name="skud")
+        app.router.add_get("/api/v0/skud/shared/{skud_id}/open/", self._skud_open, name="skud_open")
+        app.router.add_post("/api/v0/auth/", self._auth, name="auth")
+        app.router.add_post("/api/v0/cameras/my/", self._cameras_my, name="cameras_my")
+        app.router.add_post("/api/v0/cameras/this/", self._cameras_this, name="cameras_this")
+        app.router.add_get("/api/v0/screenshots/{name}", self._screenshot, name="screenshot")
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+        site = web.SockSite(self._runner, sock, ssl_context=_server_ssl_context(self._tmp.name))
+        await site.start()
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+        self._tmp.cleanup()
+
+    def connector(self) -> TCPConnector:
+        """Connector that sends every host to the emulator; certificates are not verified."""
+        return TCPConnector(ssl=False, resolver=_EmulatorResolver(self.port))
+
+    async def attach(self, api) -> None:
+        """Point the HTTP session of a UcamsApi/DomApi at the emulator."""
+        headers = dict(api.session.headers)
+        await api.session.close()
+        api.session = ClientSession(connector=self.connector(), headers=headers)
+
+    # -- токены -----------------------------------------------------------
+
+    def _issue(self, kind: str, ttl: int, **claims) -> str:
+        payload = {"kind": kind, "gen": self._generations[kind], "exp": int(time.time()) + ttl, **claims}
+        return jwt.encode(payload, SECRET)
+
+    def _valid(self, token: str | None, kind: str) -> dict | None:
+        if not token:
+            return None
+        try:
+            claims = jwt.decode(token, SECRET, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            return None
+        if claims.get("kind") != kind or claims.get("gen") != self._generations[kind]:
+            return None
+        return claims
+
+    def _authorized(self, request: web.Request, scheme: str, kind: str) -> bool:
+        header = request.headers.get("Authorization", "")
+        prefix = f"{scheme} "
+        return header.startswith(prefix) and self._valid(header[len(prefix):], kind) is not None
+
+    # -- middleware -------------------------------------------------------
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        route = request.match_info.route.name or "unknown"
+        self.requests[route] += 1
+        profile = self.profile
+        delay = profile.latency + profile.route_latency.get(route, 0.0)
+        if profile.jitter:
+            delay += self._random.uniform(0, profile.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        faults = self._faults.get(route)
+        if faults:
+            return self._fault(faults.popleft())
+        if profile.throttle_rate and self._random.random() < profile.throttle_rate:
+            return self._fault(429)
+        if profile.error_rate and self._random.random() < profile.error_rate:
+            return self._fault(503)
+        return await handler(request)
+
+    def _fault(self, status: int) -> web.Response:
+        headers = {"Retry-After": str(self.profile.retry_after)} if status == 429 else None
+        return web.json_response({"detail": "injected"}, status=status, headers=headers)
+
+    # -- dom.ufanet.ru ----------------------------------------------------
+
+    async def _auth_by_contract(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if data.get("contract") != self.contract or data.get("password") != self.password:
+            return web.json_response({"detail": "invalid credentials"}, status=401)
+        return web.json_response({"token": {
+            "access": self._issue("access", self.token_ttl),
+            "refresh": self._issue("refresh", self.token_ttl * 4),
+        }})
+
+    async def _refresh(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if not self._valid(data.get("refresh"), "refresh"):
+            return web.json_response({"detail": "invalid refresh"}, status=401)
+        return web.json_response({"token": {"access": self._issue("access", self.token_ttl)}})
+
+    async def _contract(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "JWT", "access"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        return web.json_response([{"isp_org": {"cams_server": {"url": CAMS_URL}}}])
+
+    async def _skud_shared(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "JWT", "access"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        return web.json_response(self.skuds)
+
+    async def _skud_open(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "JWT", "access"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        return web.json_response({"result": True})
+
+    # -- cams server ------------------------------------------------------
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "JWT", "access"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        ttl = int(request.query.get("ttl", self.token_ttl))
+        return web.json_response({"token": self._issue("cams", min(ttl, self.token_ttl))})
+
+    def _camera_record(self, camera: dict, fields: list[str], data: dict) -> dict:
+        record = {key: value for key, value in camera.items() if key in fields or key == "number"}
+        if "token_l" in fields:
+            record["token_l"] = self._issue(
+                "token_l", min(data.get("token_l_ttl", self.token_l_ttl), self.token_l_ttl), number=camera["number"]
+            )
+        if "token_d" in fields:
+            record["token_d"] = self._issue(
+                "token_d", data.get("token_d_ttl", 3600), number=camera["number"],
+                start=data.get("token_d_start"), duration=data.get("token_d_duration"),
+            )
+        return record
+
+    async def _cameras_my(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "Bearer", "cams"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        data = await request.json()
+        page_size = data.get("page_size", 60)
+        start = (data.get("page", 1) - 1) * page_size
+        fields = data.get("fields", [])
+        results = [self._camera_record(camera, fields, data) for camera in self.cameras[start:start + page_size]]
+        return web.json_response({"count": len(self.cameras), "results": results})
+
+    async def _cameras_this(self, request: web.Request) -> web.Response:
+        if not self._authorized(request, "Bearer", "cams"):
+            return web.json_response({"detail": "unauthorized"}, status=401)
+        data = await request.json()
+        numbers = set(data.get("numbers", []))
+        fields = data.get("fields", [])
+        results = [self._camera_record(camera, fields, data) for camera in self.cameras if camera["number"] in numbers]
+        return web.json_response({"results": results})
+
+    async def _screenshot(self, request: web.Request) -> web.Response:
+        number = request.match_info["name"].split("~")[0]
+        claims = self._valid(request.query.get("token"), "token_l")
+        if not claims or claims.get("number") != number:
+            return web.json_response({"detail": "forbidden"}, status=403)
+        etag = f'"{number}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=JPEG, content_type="image/jpeg", headers={"ETag": etag})
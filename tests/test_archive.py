@@ -0,0 +1,67 @@
+""" Tests for the archive module """
+import pytest
+from aioresponses import CallbackResult, aioresponses
+
+from custom_components.ucams.archive import ArchiveDownloader, split_window
+from custom_components.ucams.metrics import RequestMetrics
+
+
+class FakeCamerasApi:
+    def __init__(self, session):
+        self.session = session
+        self.metrics = RequestMetrics()
+
+    async def get_authenticated_session(self):
+        return self.session
+
+    async def get_cameras_archive(self, windows):
+        return {
+            window: f"https://archive.example.com/{window[0]}/archive-{window[1]}-{window[2]}.mp4?token=t"
+            for window in windows
+        }
+
+
+def test_split_window():
+    """Test that long windows are split into hour segments"""
+    assert split_window(0, 3600) == [(0, 3600)]
+    assert split_window(100, 8000) == [(100, 3600), (3700, 3600), (7300, 800)]
+
+
+@pytest.mark.asyncio
+async def test_download_resumes_with_range(hass, tmp_path):
+    """Test that an interrupted download continues from its .part file"""
+    from aiohttp import ClientSession
+    path = str(tmp_path / "out.mp4")
+    (tmp_path / "out.mp4.part0").write_bytes(b"abc")
+
+    def archive(url, **kwargs):
+        assert kwargs["headers"]["Range"] == "bytes=3-"
+        return CallbackResult(status=206, body=b"def")
+
+    async with ClientSession() as session:
+        with aioresponses() as m:
+            m.get("https://archive.example.com/CAM1/archive-0-600.mp4?token=t", callback=archive)
+            progress = []
+            downloader = ArchiveDownloader(hass, FakeCamerasApi(session))
+            size = await downloader.async_download("CAM1", 0, 600, path, lambda *args: progress.append(args))
+    assert size == 6
+    assert (tmp_path / "out.mp4").read_bytes() == b"abcdef"
+    assert not (tmp_path / "out.mp4.part0").exists()
+    assert progress[-1] == (6, 6)
+
+
+@pytest.mark.asyncio
+async def test_download_long_window_in_segments(hass, tmp_path):
+    """Test that windows longer than an hour are fetched as TS segments and joined in order"""
+    from aiohttp import ClientSession
+    path = str(tmp_path / "out.ts")
+    async with ClientSession() as session:
+        with aioresponses() as m:
+            m.get("https://archive.example.com/CAM1/archive-0-3600.ts?token=t", body=b"first")
+            m.get("https://archive.example.com/CAM1/archive-3600-1800.ts?token=t", body=b"second")
+            cameras_api = FakeCamerasApi(session)
+            size = await ArchiveDownloader(hass, cameras_api).async_download("CAM1", 0, 5400, path)
+    assert (tmp_path / "out.ts").read_bytes() == b"firstsecond"
+    assert size == 11
+    assert cameras_api.metrics.endpoints["GET archive"].requests == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.ts"]
@@ -0,0 +1,46 @@
+""" Tests for request metrics and the diagnostics download """
+from types import SimpleNamespace
+
+from custom_components.ucams.diagnostics import async_get_config_entry_diagnostics
+from custom_components.ucams.metrics import RequestMetrics, endpoint_name
+from custom_components.ucams.records import CameraRecord
+from custom_components.ucams.retry import RequestPolicy
+
+
+async def test_diagnostics_redacts_credentials_and_tokens(hass, config_entry):
+    metrics = RequestMetrics()
+    screenshot = endpoint_name("get", "https://s1.example.com/api/v0/screenshots/1712~600.jpg?token=secret")
+    metrics.record(screenshot, 200, 0.04)
+    metrics.record(screenshot, 401, 0.3)
+    metrics.record("POST /api/v0/auth/", None, 30)
+    policy = RequestPolicy(failure_threshold=1)
+    policy.breaker("s1.example.com").record_failure()
+    camera = CameraRecord("1712", "Камера", "flussonic.example.com", "s1.example.com")
+    camera.set_token("secret", 100)
+    cameras_api = SimpleNamespace(
+        token_expiration=100,
+        token_refresh_count=2,
+        metrics=metrics,
+        policy=policy,
+        cams_server="https://cams.example.com",
+        cameras={"1712": camera},
+    )
+    dom_api = SimpleNamespace(
+        token_expiration=200, token_refresh_count=1, metrics=RequestMetrics(), policy=RequestPolicy()
+    )
+    hass.data[config_entry.entry_id] = {"cameras_api": cameras_api, "dom_api": dom_api}
+
+    result = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert result["entry"]["options"]["password"] == "**REDACTED**"
+    assert result["entry"]["options"]["username"] == "**REDACTED**"
+    assert result["cameras_api"]["cameras"]["1712"]["token_l"] == "**REDACTED**"
+    assert "secret" not in str(result)
+    stats = result["cameras_api"]["metrics"]
+    assert screenshot == "GET /api/v0/screenshots/{id}"
+    assert stats["requests"] == 3
+    assert stats["errors"] == 2
+    assert stats["unauthorized"] == 1
+    assert stats["endpoints"][screenshot]["latency_p50_ms"] == 50
+    assert stats["endpoints"]["POST /api/v0/auth/"]["latency_buckets_ms"]["inf"] == 1
+    assert result["cameras_api"]["request_policy"]["breakers"]["s1.example.com"]["state"] == "open"
@@ -0,0 +1,124 @@
+""" End-to-end tests of UcamsApi and DomApi against the local emulator """
+import asyncio
+
+import aiohttp
+import pytest
+
+from custom_components.ucams.utils import SCREEN
+from tests.emulator import LoadProfile, UfanetEmulator
+
+
+@pytest.fixture
+async def emulator():
+    emulator = UfanetEmulator(cameras=25, skuds=3, profile=LoadProfile(retry_after=0))
+    await emulator.start()
+    yield emulator
+    await emulator.close()
+
+
+@pytest.fixture
+async def apis(hass, config_entry, emulator):
+    from custom_components.ucams.ucams import UcamsApi
+    from custom_components.ucams.ufanet import DomApi
+
+    config_entry.options = {**config_entry.options, "cameras_page_size": 10}
+    dom_api = DomApi(hass, config_entry)
+    cameras_api = UcamsApi(hass, config_entry, dom_api)
+    await emulator.attach(dom_api)
+    await emulator.attach(cameras_api)
+    cameras_api.policy.base_delay = dom_api.policy.base_delay = 0
+    yield cameras_api, dom_api
+    await cameras_api.close()
+    await dom_api.close()
+
+
+async def test_end_to_end_with_pagination(apis, emulator):
+    """Test the camera list, screenshots and SKUDs through real HTTP"""
+    cameras_api, dom_api = apis
+
+    cameras = await cameras_api.get_cameras_info()
+    assert len(cameras) == 25
+    assert emulator.requests["cameras_my"] == 3
+
+    number = next(iter(cameras))
+    assert (await cameras_api.get_camera_image(number)).startswith(b"\xff\xd8")
+    assert await cameras_api.get_camera_url(number, SCREEN)
+    assert len(await dom_api.get_shared_skud()) == 3
+    assert emulator.requests["auth"] == 1
+    assert emulator.requests["auth_by_contract"] == 1
+
+
+async def test_revoked_tokens_are_renewed(apis, emulator):
+    """Test that a 401 for a locally valid token renews it, for cams and dom tokens alike"""
+    cameras_api, dom_api = apis
+    await cameras_api.get_cameras_info()
+
+    emulator.expire_tokens("cams")
+    await cameras_api.inventory.async_get(force=True)
+    assert emulator.requests["auth"] == 2
+
+    emulator.expire_tokens()
+    await cameras_api.inventory.async_get(force=True)
+    assert len(await dom_api.get_shared_skud()) == 3
+    # Отозванный dom-токен отклоняется на auth камер один раз, затем он обновляется
+    assert emulator.requests["auth"] == 4
+    assert emulator.requests["auth_by_contract"] == 2
+
+
+async def test_concurrent_401s_renew_token_once(apis, emulator):
+    """Test that requests in flight with a revoked token share one renewal"""
+    cameras_api, dom_api = apis
+    await cameras_api.get_cameras_info()
+    numbers = list(cameras_api.cameras)
+
+    emulator.expire_tokens("cams")
+    await asyncio.gather(*(cameras_api.refresh_camera_tokens([number]) for number in numbers[:20]))
+    assert emulator.requests["auth"] == 2
+
+    emulator.expire_tokens("access")
+    await asyncio.gather(*(dom_api.get_shared_skud() for _ in range(20)))
+    assert emulator.requests["refresh"] == 1
+    assert emulator.requests["auth_by_contract"] == 1
+
+
+async def test_retries_and_circuit_breaker(apis, emulator):
+    """Test Retry-After on 429, bounded 5xx retries and cached screenshots while the circuit is open"""
+    cameras_api, dom_api = apis
+    await cameras_api.get_cameras_info()
+    number = next(iter(cameras_api.cameras))
+    image = await cameras_api.get_camera_image(number)
+
+    emulator.inject("skud", 429)
+    assert len(await dom_api.get_shared_skud()) == 3
+    assert emulator.requests["skud"] == 2
+
+    emulator.inject("screenshot", *[503] * 5)
+    cameras_api.screenshots.get(number).fetched_at -= 3600
+    with pytest.raises(aiohttp.ClientResponseError) as err:
+        await cameras_api.get_camera_image(number)
+    assert err.value.status == 503
+    assert emulator.requests["screenshot"] == 4
+
+    # Пятый отказ подряд размыкает цепь, дальше отдаётся последний кадр без запросов
+    assert await cameras_api.get_camera_image(number) == image
+    assert await cameras_api.get_camera_image(number) == image
+    assert emulator.requests["screenshot"] == 6
+    breaker = cameras_api.policy.as_dict()["breakers"]["screen.example.com"]
+    assert breaker["state"] == "open" and breaker["opened"] == 1
+
+
+async def test_latency_profile_is_recorded(hass, config_entry):
+    """Test that injected latency shows up in the request metrics"""
+    from custom_components.ucams.ufanet import DomApi
+
+    emulator = UfanetEmulator(profile=LoadProfile(route_latency={"skud": 0.1}))
+    await emulator.start()
+    dom_api = DomApi(hass, config_entry)
+    await emulator.attach(dom_api)
+    try:
+        await dom_api.get_shared_skud()
+    finally:
+        await dom_api.close()
+        await emulator.close()
+    stats = dom_api.metrics.endpoints["GET /api/v0/skud/shared/"]
+    assert stats.latency_max_ms >= 100
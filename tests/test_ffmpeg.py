@@ -0,0 +1,115 @@
+""" Tests for the ffmpeg module """
+import asyncio
+import sys
+
+import pytest
+
+from custom_components.ucams.ffmpeg import FFmpegSnapshotRunner
+
+
+def fake_ffmpeg(tmp_path, body):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport sys, time\n{body}\n")
+    script.chmod(0o755)
+    return str(script)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_stdout_and_records_stats(tmp_path):
+    """Test that the snapshot is read from stdout and CPU time is parsed"""
+    binary = fake_ffmpeg(
+        tmp_path,
+        "sys.stdout.buffer.write(b'jpeg')\nsys.stderr.write('bench: utime=0.250s stime=0.050s rtime=1.000s\\n')",
+    )
+    runner = FFmpegSnapshotRunner(max_processes=1, timeout=10, binary=binary)
+    assert await runner.async_snapshot("CAM1", "rtsp://example.com/CAM1") == b"jpeg"
+    assert runner.stats["CAM1"]["last_cpu_time"] == 0.3
+    assert runner.stats["CAM1"]["failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_snapshot_timeout_kills_process(tmp_path):
+    """Test that a hanging ffmpeg is killed without blocking the event loop"""
+    binary = fake_ffmpeg(tmp_path, "time.sleep(30)")
+    runner = FFmpegSnapshotRunner(max_processes=1, timeout=0.5, binary=binary)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.05)
+
+    ticker_task = asyncio.create_task(ticker())
+    assert await runner.async_snapshot("CAM1", "rtsp://example.com/CAM1") is None
+    ticker_task.cancel()
+    assert ticks > 3
+    assert runner.stats["CAM1"]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_keyframe_grabber_buffers_frames_and_restarts(hass, tmp_path):
+    """Test that the grabber keeps the latest JPEG frames and restarts on demand"""
+    from custom_components.ucams.ffmpeg import KeyframeGrabber
+    starts = tmp_path / "starts"
+    binary = fake_ffmpeg(
+        tmp_path,
+        f"open({str(starts)!r}, 'a').write('x')\n"
+        "for i in range(3):\n"
+        "    sys.stdout.buffer.write(b'\\xff\\xd8frame%d\\xff\\xd9' % i)\n"
+        "    sys.stdout.flush()\n"
+        "time.sleep(30)",
+    )
+    urls = []
+
+    async def url_provider():
+        urls.append("rtsp://example.com/CAM1")
+        return urls[-1]
+
+    grabber = KeyframeGrabber(hass, "CAM1", url_provider, buffer_size=2, binary=binary)
+    grabber.start()
+    for _ in range(100):
+        if len(grabber.frames) == 2 and grabber.latest(30) == b"\xff\xd8frame2\xff\xd9":
+            break
+        await asyncio.sleep(0.05)
+    assert [frame for _, frame in grabber.frames] == [b"\xff\xd8frame1\xff\xd9", b"\xff\xd8frame2\xff\xd9"]
+
+    grabber.restart()
+    for _ in range(100):
+        if len(urls) == 2:
+            break
+        await asyncio.sleep(0.05)
+    assert len(urls) == 2
+    await grabber.stop()
+    assert not grabber.running
+
+
+def test_keyframe_buffer_is_capped_without_eoi(monkeypatch):
+    """Test that a stream without EOI markers does not grow the frame buffer without limit"""
+    from custom_components.ucams import ffmpeg
+    monkeypatch.setattr(ffmpeg, "KEYFRAME_MAX_FRAME_SIZE", 64)
+    grabber = ffmpeg.KeyframeGrabber(None, "CAM1", None, buffer_size=2)
+
+    buffer = bytearray(b"\xff\xd8" + b"\0" * 50 + b"\xff\xd8" + b"\1" * 20)
+    grabber._extract_frames(buffer)
+    assert buffer == b"\xff\xd8" + b"\1" * 20
+
+    buffer += b"\1" * 100
+    grabber._extract_frames(buffer)
+    assert buffer == b""
+
+    buffer += b"\xff\xd8frame\xff\xd9"
+    grabber._extract_frames(buffer)
+    assert [frame for _, frame in grabber.frames] == [b"\xff\xd8frame\xff\xd9"]
+
+
+def test_ffmpeg_max_processes_must_be_positive(config_entry):
+    """Test that the ffmpeg process limit option rejects 0 and negative values"""
+    import voluptuous as vol
+    from custom_components.ucams import OPTIONS_SCHEMA
+
+    schema = vol.Schema(OPTIONS_SCHEMA)
+    assert schema({**config_entry.options, "ffmpeg_max_processes": 1})["ffmpeg_max_processes"] == 1
+    for value in (0, -1):
+        with pytest.raises(vol.Invalid):
+            schema({**config_entry.options, "ffmpeg_max_processes": value})
@@ -0,0 +1,55 @@
+""" Tests for the image module """
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeCamerasApi:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def get_camera_image(self, camera_id):
+        self.calls.append(camera_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return b"image_data"
+
+
+def fake_entity(camera_id):
+    entity = SimpleNamespace(camera_id=camera_id, updated=0)
+
+    def mark_updated():
+        entity.updated += 1
+
+    entity.async_mark_image_updated = mark_updated
+    return entity
+
+
+@pytest.mark.asyncio
+async def test_image_refresh_scheduler(hass):
+    """Test that refreshes are spread over the interval, bounded and never pile up"""
+    from custom_components.ucams.image import ImageRefreshScheduler
+    cameras_api = FakeCamerasApi()
+    scheduler = ImageRefreshScheduler(hass, cameras_api, interval=600, max_in_flight=2)
+    entities = [fake_entity(f"CAM{i}") for i in range(6)]
+    for entity in entities:
+        scheduler.async_add(entity)
+        scheduler.async_add(entity)
+    assert all(scheduler.pending(entity.camera_id) for entity in entities)
+    assert len(scheduler._cancel) == 6
+    phases = {scheduler._phase(entity.camera_id) for entity in entities}
+    assert len(phases) == 6 and all(0 <= phase <= 600 for phase in phases)
+
+    await asyncio.gather(*(scheduler.async_refresh(entity.camera_id) for entity in entities))
+    assert cameras_api.max_in_flight == 2
+    assert all(entity.updated == 1 for entity in entities)
+    assert len(scheduler._cancel) == 6
+
+    for entity in entities:
+        scheduler.async_remove(entity.camera_id)
+    assert not scheduler._cancel
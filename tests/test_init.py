@@ -0,0 +1,169 @@
+""" Tests for the integration services """
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeCamera:
+    def __init__(self, camera_id, image):
+        self.camera_id = camera_id
+        self._image = image
+
+    async def handle_snapshot_from_rtsp(self):
+        await asyncio.sleep(0.01)
+        if isinstance(self._image, Exception):
+            raise self._image
+        return self._image
+
+
+@pytest.mark.asyncio
+async def test_snapshot_service_many_entities(hass, tmp_path):
+    """Test that the snapshot service handles many cameras and reports per-entity results"""
+    from custom_components.ucams import async_setup
+    cameras = {
+        "camera.ok": FakeCamera("CAM1", b"jpeg"),
+        "camera.broken": FakeCamera("CAM2", RuntimeError("ffmpeg failed")),
+    }
+    hass.data["camera"] = SimpleNamespace(get_entity=cameras.get)
+    await async_setup(hass, {})
+
+    response = await hass.services.async_call(
+        "ucams",
+        "snapshot",
+        {
+            "entity_id": ["camera.ok", "camera.broken", "camera.missing"],
+            "filename": str(tmp_path / "{object_id}_{camera_id}.jpg"),
+        },
+        blocking=True,
+        return_response=True,
+    )
+    results = response["results"]
+    assert results["camera.ok"]["success"] and not results["camera.ok"]["fallback"]
+    assert (tmp_path / "ok_CAM1.jpg").read_bytes() == b"jpeg"
+    assert results["camera.broken"]["success"] and results["camera.broken"]["fallback"]
+    assert (tmp_path / "broken_CAM2.jpg").exists()
+    assert not results["camera.missing"]["success"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_service_rejects_bad_template(hass, tmp_path):
+    """Test that an unknown placeholder or a stray brace is rejected by the schema"""
+    import voluptuous as vol
+    from custom_components.ucams import async_setup
+    hass.data["camera"] = SimpleNamespace(get_entity={"camera.ok": FakeCamera("CAM1", b"jpeg")}.get)
+    await async_setup(hass, {})
+
+    for template in ("{unknown}.jpg", "{0}.jpg", "snap_{.jpg"):
+        with pytest.raises(vol.Invalid):
+            await hass.services.async_call(
+                "ucams",
+                "snapshot",
+                {"entity_id": "camera.ok", "filename": str(tmp_path / template)},
+                blocking=True,
+                return_response=True,
+            )
+
+
+@pytest.mark.asyncio
+async def test_snapshot_service_rejects_shared_filename(hass, tmp_path):
+    """Test that several cameras cannot be written to one file"""
+    import voluptuous as vol
+    from custom_components.ucams import async_setup
+    cameras = {"camera.one": FakeCamera("CAM1", b"one"), "camera.two": FakeCamera("CAM2", b"two")}
+    hass.data["camera"] = SimpleNamespace(get_entity=cameras.get)
+    await async_setup(hass, {})
+
+    for template in ("snap.jpg", "snap_{timestamp}.jpg"):
+        with pytest.raises(vol.Invalid):
+            await hass.services.async_call(
+                "ucams",
+                "snapshot",
+                {"entity_id": ["camera.one", "camera.two"], "filename": str(tmp_path / template)},
+                blocking=True,
+                return_response=True,
+            )
+
+    # Для одной камеры фиксированное имя, как в существующих автоматизациях, допустимо
+    response = await hass.services.async_call(
+        "ucams",
+        "snapshot",
+        {"entity_id": "camera.one", "filename": str(tmp_path / "snap.jpg")},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["results"]["camera.one"]["success"]
+    assert (tmp_path / "snap.jpg").read_bytes() == b"one"
+
+
+@pytest.mark.asyncio
+async def test_archive_service_many_entities_and_windows(hass):
+    """Test that the archive service resolves all cameras and windows in one batch call"""
+    from custom_components.ucams import async_setup
+
+    class FakeCamerasApi:
+        def __init__(self):
+            self.calls = []
+
+        async def get_cameras_archive(self, windows):
+            self.calls.append(windows)
+            return {window: f"https://archive/{window[0]}/{window[1]}-{window[2]}" for window in windows}
+
+    cameras_api = FakeCamerasApi()
+    cameras = {
+        entity_id: SimpleNamespace(camera_id=camera_id, cameras_api=cameras_api, config_entry_id="1")
+        for entity_id, camera_id in (("camera.one", "CAM1"), ("camera.two", "CAM2"))
+    }
+    hass.data["camera"] = SimpleNamespace(get_entity=cameras.get)
+    hass.data["1"] = {}
+    await async_setup(hass, {})
+
+    response = await hass.services.async_call(
+        "ucams",
+        "get_archive",
+        {
+            "entity_id": ["camera.one", "camera.two"],
+            "windows": [{"start_time": 100, "duration": 60}, {"start_time": 200, "duration": 60}],
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert len(cameras_api.calls) == 1
+    assert response["results"]["camera.two"][1] == {
+        "start_time": 200, "duration": 60, "url": "https://archive/CAM2/200-60",
+    }
+
+
+@pytest.mark.asyncio
+async def test_download_archive_stays_in_media_dir(hass, tmp_path):
+    """Test that download_archive rejects filenames that leave media/ucams"""
+    import voluptuous as vol
+    from custom_components.ucams import async_setup
+    camera = SimpleNamespace(camera_id="CAM1", cameras_api=None, config_entry_id="1")
+    hass.data["camera"] = SimpleNamespace(get_entity={"camera.one": camera}.get)
+    hass.data["1"] = {}
+    hass.config.media_dirs = {"local": str(tmp_path / "media")}
+    await async_setup(hass, {})
+
+    for filename in ("../escape.mp4", "/tmp/escape.mp4", "clips/../../escape.mp4"):
+        with pytest.raises(vol.Invalid):
+            await hass.services.async_call(
+                "ucams",
+                "download_archive",
+                {"entity_id": "camera.one", "start_time": 100, "duration": 60, "filename": filename},
+                blocking=True,
+                return_response=True,
+            )
+
+    # Симлинк внутри media/ucams, ведущий наружу, отсекается по итоговому пути
+    (tmp_path / "media" / "ucams").mkdir(parents=True)
+    (tmp_path / "media" / "ucams" / "outside").symlink_to(tmp_path)
+    response = await hass.services.async_call(
+        "ucams",
+        "download_archive",
+        {"entity_id": "camera.one", "start_time": 100, "duration": 60, "filename": "outside/escape.mp4"},
+        blocking=True,
+        return_response=True,
+    )
+    result = response["results"]["camera.one"]
+    assert not result["success"] and result["error"] == "path not allowed"
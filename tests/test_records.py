@@ -0,0 +1,20 @@
+""" Tests for the compact camera records """
+from custom_components.ucams.records import CameraRecord
+from custom_components.ucams.utils import SCREEN, VIDEO
+
+
+def test_urls_are_built_lazily_and_reset_on_token_change():
+    camera = CameraRecord("CAM1", "Камера", "flussonic.example.com", "screen.example.com")
+    assert camera.url(VIDEO) is None
+
+    assert not camera.set_token("t1", 100)
+    assert camera._urls is None
+    assert camera["url_video"] == "rtsp://flussonic.example.com/CAM1?token=t1&tracks=v1a1"
+    assert camera.url(SCREEN) == "https://screen.example.com/api/v0/screenshots/CAM1~600.jpg?token=t1"
+    assert camera.url(VIDEO) is camera.url(VIDEO)
+
+    assert camera.set_token("t2", 200)
+    assert camera.get("url_video").endswith("token=t2&tracks=v1a1")
+    assert camera["title"] == "Камера" and camera["token_exp"] == 200
+    assert camera.get("unknown", "x") == "x"
+    assert not hasattr(camera, "__dict__")
@@ -0,0 +1,131 @@
+""" Tests for the shared request policy """
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import formatdate
+from time import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+import pytest
+
+from custom_components.ucams.retry import CircuitOpenError, RequestPolicy
+
+URL = "https://cams.example.com/api/v0/cameras/my/"
+
+
+def fake_send(*outcomes):
+    """send() factory answering with the given statuses, (status, headers) pairs or exceptions, in order."""
+    sent = []
+
+    @asynccontextmanager
+    async def send():
+        outcome = outcomes[len(sent)]
+        sent.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        yield SimpleNamespace(status=status, headers=headers)
+
+    return send, sent
+
+
+async def request(policy, send, **kwargs):
+    """Run policy.request and return the final status together with the backoff delays it slept."""
+    with patch("custom_components.ucams.retry.asyncio.sleep", new=AsyncMock()) as sleep:
+        async with policy.request(send, URL, **kwargs) as resp:
+            status = resp.status
+    return status, [call.args[0] for call in sleep.await_args_list]
+
+
+def test_backoff_honours_retry_after_and_caps_delay():
+    policy = RequestPolicy(base_delay=1, max_delay=10)
+    assert policy.backoff(1, "3") == 3
+    assert 0 < policy.backoff(1, formatdate(time() + 5, usegmt=True)) <= 5
+    assert policy.backoff(1, "3600") == 10
+    assert all(0 <= policy.backoff(attempt) <= min(10, 2 ** (attempt - 1)) for attempt in range(1, 8))
+
+
+def test_circuit_opens_and_lets_one_trial_through():
+    policy = RequestPolicy(failure_threshold=2, reset_timeout=60)
+    breaker = policy.breaker("cams.example.com")
+    breaker.record_status(503)
+    breaker.record_status(429)
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    with patch("custom_components.ucams.retry.monotonic", return_value=breaker._opened_at + 61):
+        breaker.check()
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        breaker.record_status(200)
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+async def test_request_attempts_are_capped():
+    """Test that 5xx is retried up to max_attempts and the last response is returned as is"""
+    policy = RequestPolicy(max_attempts=3, base_delay=0)
+    send, sent = fake_send(503, 502, 503, 200)
+    status, delays = await request(policy, send)
+    assert status == 503
+    assert len(sent) == 3 and len(delays) == 2
+    assert policy.retries == 2
+
+
+async def test_request_renews_token_once_on_401():
+    """Test that 401 calls on_unauthorized once and retries right away"""
+    policy = RequestPolicy(max_attempts=3)
+    on_unauthorized = AsyncMock()
+    send, sent = fake_send(401, 200)
+    status, delays = await request(policy, send, on_unauthorized=on_unauthorized)
+    assert status == 200
+    assert len(sent) == 2 and delays == []
+    on_unauthorized.assert_awaited_once()
+
+    # Без обработчика 401 отдаётся вызывающему без повторов
+    send, sent = fake_send(401)
+    assert (await request(policy, send))[0] == 401
+    assert len(sent) == 1
+
+
+async def test_request_without_retry_errors():
+    """Test that retry_errors=False returns 5xx and raises transport errors at once, but still retries 429"""
+    policy = RequestPolicy(max_attempts=3, base_delay=0)
+    send, sent = fake_send(503)
+    assert (await request(policy, send, retry_errors=False))[0] == 503
+    assert len(sent) == 1
+
+    send, sent = fake_send(aiohttp.ServerDisconnectedError())
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        await request(policy, send, retry_errors=False)
+    assert len(sent) == 1
+
+    send, sent = fake_send((429, {"Retry-After": "1"}), 200)
+    status, delays = await request(policy, send, retry_errors=False)
+    assert status == 200 and delays == [1]
+
+
+async def test_request_caps_retry_after():
+    """Test that a long Retry-After is capped by max_delay"""
+    policy = RequestPolicy(max_attempts=3, max_delay=10)
+    send, sent = fake_send((429, {"Retry-After": "3600"}), 200)
+    status, delays = await request(policy, send)
+    assert status == 200 and delays == [10]
+
+
+async def test_request_retries_transport_errors():
+    """Test that connection errors and timeouts are retried and the last one is raised"""
+    policy = RequestPolicy(max_attempts=3, base_delay=0)
+    send, sent = fake_send(aiohttp.ClientConnectionError(), asyncio.TimeoutError(), 200)
+    status, delays = await request(policy, send)
+    assert status == 200 and len(delays) == 2
+
+    send, sent = fake_send(*[asyncio.TimeoutError()] * 3)
+    with pytest.raises(asyncio.TimeoutError):
+        await request(policy, send)
+    assert len(sent) == 3
+    assert policy.breaker("cams.example.com").failures == 3
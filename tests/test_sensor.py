@@ -0,0 +1,119 @@
+""" Tests for the sensor module """
+import copy
+
+import pytest
+
+DETAIL = {
+    "contract_id": 1,
+    "contract_title": "1234",
+    "contract_address": {"city": "Уфа", "street": "Ленина", "house": "1", "flat": "2"},
+    "balance": {
+        "input_saldo": 0, "charge": 500, "payment": 500, "current": 100,
+        "output_saldo": 100, "recommended": 400, "limit": 0, "expiry_date": 0,
+    },
+    "services": [{
+        "service_id": 7, "service_title_name": "Интернет", "service_status": "active",
+        "period_end": 0, "cost": 500, "tariff": {"title": "Тариф", "speed": 100}, "date_from": "2024-01-01",
+    }],
+}
+CONTRACT = {"contract_id": 1, "billing_id": 10, "title": "1234"}
+
+
+class FakeDomApi:
+    def __init__(self):
+        self.detail = copy.deepcopy(DETAIL)
+
+    async def get_all_contracts(self):
+        return {"status": "ok", "detail": {"contracts": [CONTRACT]}}
+
+    async def get_contracts_details(self, contracts):
+        return {1: [copy.deepcopy(self.detail)]}
+
+
+@pytest.mark.asyncio
+async def test_contract_sensors_write_state_only_on_change(hass):
+    """Test that polling updates write state only for sensors whose data changed"""
+    from custom_components.ucams.sensor import ContractDetailSensor, ContractsCoordinator, ServiceDetailSensor
+    dom_api = FakeDomApi()
+    coordinator = ContractsCoordinator(hass, dom_api, 3600)
+    await coordinator.async_refresh()
+    contract_sensor = ContractDetailSensor(coordinator, coordinator.data["details"][1][0])
+    service_sensor = ServiceDetailSensor(coordinator, CONTRACT, DETAIL["services"][0])
+    writes = {"contract": 0, "service": 0}
+    for name, sensor in (("contract", contract_sensor), ("service", service_sensor)):
+        sensor._last_written = sensor._state_signature()
+        sensor.async_write_ha_state = lambda name=name: writes.__setitem__(name, writes[name] + 1)
+        coordinator.async_add_listener(sensor._handle_coordinator_update)
+
+    await coordinator.async_refresh()
+    assert writes == {"contract": 0, "service": 0}
+
+    dom_api.detail["balance"]["current"] = 50
+    await coordinator.async_refresh()
+    assert writes == {"contract": 1, "service": 0}
+    assert contract_sensor.native_value == 50
+
+    dom_api.detail["services"][0]["service_status"] = "blocked"
+    await coordinator.async_refresh()
+    assert writes == {"contract": 1, "service": 1}
+    assert service_sensor.native_value == "blocked"
+
+
+@pytest.mark.asyncio
+async def test_restored_contracts_create_sensors_without_cloud(hass):
+    """Test that stored contracts create the sensors at once and the first poll runs in the background"""
+    import asyncio
+    from types import SimpleNamespace
+
+    from custom_components.ucams import sensor
+
+    dom_api = FakeDomApi()
+    dom_api.contracts = {"contracts": [CONTRACT], "details": [copy.deepcopy(DETAIL)]}
+    release = asyncio.Event()
+    get_all_contracts = dom_api.get_all_contracts
+
+    async def slow_contracts():
+        await release.wait()
+        return await get_all_contracts()
+
+    dom_api.get_all_contracts = slow_contracts
+    background = []
+    config_entry = SimpleNamespace(
+        entry_id="1",
+        options={},
+        async_on_unload=lambda func: None,
+        async_create_background_task=lambda hass_, target, name: background.append(
+            hass_.async_create_background_task(target, name)
+        ),
+    )
+    saves = []
+    hass.data["1"] = {
+        "dom_api": dom_api,
+        "cameras_api": SimpleNamespace(),
+        "cameras_info": {"CAM1": {"id": "CAM1", "title": "Подъезд"}},
+        "store": SimpleNamespace(async_schedule_save=lambda *apis: saves.append(apis)),
+    }
+    entities = []
+    await asyncio.wait_for(sensor.async_setup_entry(hass, config_entry, entities.extend), 1)
+
+    contract_sensor = next(entity for entity in entities if isinstance(entity, sensor.ContractDetailSensor))
+    assert contract_sensor.native_value == 100
+    assert any(isinstance(entity, sensor.ServiceDetailSensor) for entity in entities)
+    assert not background[0].done()
+
+    release.set()
+    await background[0]
+    assert hass.data["1"]["contracts_coordinator"].last_update_success
+    assert saves
+
+
+def test_contracts_update_interval_has_minimum(config_entry):
+    """Test that the contracts polling interval cannot be set below a minute"""
+    import voluptuous as vol
+    from custom_components.ucams import OPTIONS_SCHEMA
+
+    schema = vol.Schema(OPTIONS_SCHEMA)
+    assert schema({**config_entry.options, "contracts_update_interval": 60})["contracts_update_interval"] == 60
+    for value in (0, -5, 59):
+        with pytest.raises(vol.Invalid):
+            schema({**config_entry.options, "contracts_update_interval": value})
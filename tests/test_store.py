@@ -0,0 +1,74 @@
+""" Tests for the persisted camera inventory """
+import time
+
+import jwt
+from aioresponses import aioresponses
+from yarl import URL
+
+from custom_components.ucams.records import CameraRecord
+from custom_components.ucams.store import EntryStore
+
+
+async def test_inventory_and_tokens_survive_restart(hass, config_entry, mock_ufanet_api, dom_api):
+    from custom_components.ucams.ucams import UcamsApi
+
+    now = int(time.time())
+    token_l = jwt.encode({"exp": now + 86400}, "secret")
+    api = UcamsApi(hass, config_entry, mock_ufanet_api)
+    api.cams_server = "https://cams.example.com/"
+    api.token, api.token_expiration = "cams_token", now + 20000
+    api.cameras["CAM1"] = CameraRecord("CAM1", "Подъезд", "flussonic.example.com", "screen.example.com")
+    api._set_camera_token(api.cameras["CAM1"], token_l)
+    api.cameras_updated_at = now
+    dom_api.token, dom_api.token_expiration = "expired", now - 1
+    dom_api.refresh_token, dom_api.refresh_token_expiration = "refresh", now + 86400
+    dom_api.shared_skud = [{"id": 1, "string_view": "Домофон", "timeout": 5}]
+    await EntryStore(hass, config_entry.entry_id).async_save(api, dom_api)
+    await api.close()
+
+    restored_api = UcamsApi(hass, config_entry, mock_ufanet_api)
+    restored_dom_api = type(dom_api)(hass, config_entry)
+    try:
+        assert await EntryStore(hass, config_entry.entry_id).async_restore(restored_api, restored_dom_api)
+        assert restored_api.inventory.is_fresh
+        assert restored_api.token == "cams_token"
+        camera = restored_api.cameras["CAM1"]
+        assert camera.title == "Подъезд" and camera.token_exp == now + 86400
+        assert await restored_api.get_camera_url("CAM1", "video") == (
+            f"rtsp://flussonic.example.com/CAM1?token={token_l}&tracks=v1a1"
+        )
+        # Истёкший access-токен не восстанавливается, refresh и список СКУД - да
+        assert restored_dom_api.token is None
+        assert restored_dom_api.refresh_token == "refresh"
+        assert restored_dom_api.shared_skud[0]["id"] == 1
+    finally:
+        await restored_api.close()
+        await restored_dom_api.close()
+
+    assert not await EntryStore(hass, "unknown").async_restore(restored_api, restored_dom_api)
+
+
+async def test_restored_cams_token_survives_expired_dom_token(hass, config_entry, dom_api):
+    """Test that a valid restored cams token is used even though the dom token expired meanwhile"""
+    from custom_components.ucams.ucams import UcamsApi
+
+    now = int(time.time())
+    cams_token = jwt.encode({"exp": now + 20000}, "secret")
+    state = {
+        "cams": {"cams_server": "https://cams.example.com/", "token": cams_token, "token_expiration": now + 20000},
+        "dom": {"token": "expired", "token_expiration": now - 1},
+    }
+    dom_api.restore_state(state["dom"])
+    api = UcamsApi(hass, config_entry, dom_api)
+    api.restore_state(state["cams"])
+    cameras_url = "https://cams.example.com/api/v0/cameras/my/"
+    try:
+        with aioresponses() as m:
+            m.post(cameras_url, payload={"results": []})
+            await api.get_cameras_info()
+            request = m.requests[("POST", URL(cameras_url))][0]
+            assert request.kwargs["headers"]["Authorization"] == f"Bearer {cams_token}"
+        assert api.token_refresh_count == 0
+        assert dom_api.token_refresh_count == 0
+    finally:
+        await api.close()
@@ -0,0 +1,31 @@
+import time
+
+import jwt
+import pytest
+
+from custom_components.ucams.utils import TokenClaimsCache, decode_token
+
+
+def test_decode_token_caches_claims_until_exp():
+    token = jwt.encode({"exp": int(time.time()) + 60, "sub": "cam"}, "secret")
+    cache = TokenClaimsCache(max_entries=2)
+    cache.put(token, decode_token(token))
+
+    assert cache.get(token)["sub"] == "cam"
+    # Мутация результата не портит кэш
+    decode_token(token)["sub"] = "changed"
+    assert decode_token(token)["sub"] == "cam"
+
+    expired = jwt.encode({"exp": int(time.time()) - 1}, "secret")
+    cache.put(expired, {"exp": int(time.time()) - 1})
+    assert cache.get(expired) is None
+
+    cache.put("a", {})
+    cache.put("b", {})
+    assert len(cache) == 2
+    assert cache.get(token) is None
+
+
+def test_decode_token_fallback_errors_are_explicit():
+    with pytest.raises(ValueError):
+        decode_token("not-a-token")